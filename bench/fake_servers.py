@@ -0,0 +1,212 @@
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import multiprocessing
+import random
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+STATUSES = ('reviewing', 'rejected', 'approved')
+
+
+class FakeServer(ThreadingHTTPServer):
+    """Локальный HTTP-сервер с задержкой и долей ошибок."""
+
+    daemon_threads = True
+
+    def __init__(self, handler, latency=0.0, error_rate=0.0):
+        """Сервер слушает случайный порт на 127.0.0.1."""
+        super().__init__(('127.0.0.1', 0), handler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        """Адрес сервера."""
+        return f'http://127.0.0.1:{self.server_port}'
+
+    def start(self):
+        """Запуск в фоновом потоке."""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        """Остановка сервера."""
+        self.shutdown()
+        self.server_close()
+
+    def stats(self):
+        """Счётчики сервера."""
+        return {'requests': self.requests}
+
+
+class FakeHandler(BaseHTTPRequestHandler):
+    """Общая часть обработчиков: задержка, ошибки, JSON."""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    error = {'error': 'fake'}
+
+    def reply(self, status, data):
+        """Ответ с JSON-телом."""
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def simulate(self):
+        """Задержка и случайная ошибка; True, если ответ уже отправлен."""
+        if self.path == '/_stats':
+            self.reply(200, self.server.stats())
+            return True
+        with self.server.lock:
+            self.server.requests += 1
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if random.random() < self.server.error_rate:
+            self.reply(500, self.error)
+            return True
+        return False
+
+    def log_message(self, format, *args):
+        """Запросы не логируем."""
+
+
+class PracticumHandler(FakeHandler):
+    """Эндпоинт homework_statuses."""
+
+    def do_GET(self):
+        """Список работ токена, изменённых после from_date."""
+        if self.simulate():
+            return
+        url = urlparse(self.path)
+        if not url.path.startswith('/api/user_api/homework_statuses'):
+            self.reply(404, {})
+            return
+        token = self.headers.get('Authorization', '')
+        from_date = int(parse_qs(url.query).get('from_date', ['0'])[0])
+        homeworks = self.server.homeworks_for(token)
+        self.reply(200, {
+            'homeworks': [homework for updated, homework in homeworks
+                          if updated >= from_date],
+            'current_date': int(time.time()),
+        })
+
+
+class FakePracticum(FakeServer):
+    """API Практикума: у каждого токена payload_size работ."""
+
+    def __init__(self, latency=0.0, error_rate=0.0, payload_size=3,
+                 change_rate=0.1):
+        """change_rate — вероятность смены статуса работы при запросе."""
+        super().__init__(PracticumHandler, latency, error_rate)
+        self.payload_size = payload_size
+        self.change_rate = change_rate
+        self.tokens = {}
+
+    def homeworks_for(self, token):
+        """Работы токена со случайной сменой статусов."""
+        with self.lock:
+            homeworks = self.tokens.get(token)
+            now = int(time.time())
+            if homeworks is None:
+                homeworks = self.tokens[token] = [
+                    [now, self.homework(token, number, now)]
+                    for number in range(self.payload_size)
+                ]
+            elif random.random() < self.change_rate:
+                item = random.choice(homeworks)
+                item[0] = now
+                item[1] = dict(item[1], status=random.choice(STATUSES),
+                               date_updated=self.iso(now))
+            return [(updated, homework) for updated, homework in homeworks]
+
+    def homework(self, token, number, now):
+        """Работа в формате API."""
+        return {
+            'id': abs(hash((token, number))),
+            'homework_name': f'homework_{number}.zip',
+            'status': random.choice(STATUSES),
+            'reviewer_comment': 'x' * 64,
+            'date_updated': self.iso(now),
+            'lesson_name': f'Спринт {number}',
+        }
+
+    @staticmethod
+    def iso(timestamp):
+        """Дата в формате API."""
+        return datetime.fromtimestamp(timestamp, timezone.utc).strftime(
+            '%Y-%m-%dT%H:%M:%SZ'
+        )
+
+
+class TelegramHandler(FakeHandler):
+    """Bot API: метод sendMessage."""
+
+    error = {'ok': False, 'error_code': 500,
+             'description': 'Internal Server Error: fake'}
+
+    def do_POST(self):
+        """Принимает любое сообщение."""
+        length = int(self.headers.get('Content-Length') or 0)
+        self.rfile.read(length)
+        if self.simulate():
+            return
+        with self.server.lock:
+            self.server.messages += 1
+        self.reply(200, {'ok': True, 'result': {
+            'message_id': self.server.messages,
+            'date': int(time.time()),
+            'chat': {'id': 1, 'type': 'private'},
+        }})
+
+    do_GET = do_POST
+
+
+class FakeTelegram(FakeServer):
+    """Bot API Telegram."""
+
+    def __init__(self, latency=0.0, error_rate=0.0):
+        """Считает принятые сообщения."""
+        super().__init__(TelegramHandler, latency, error_rate)
+        self.messages = 0
+
+    def stats(self):
+        """Счётчики сервера."""
+        return dict(super().stats(), messages=self.messages)
+
+
+def serve(server_cls, kwargs, connection):
+    """Тело дочернего процесса: сервер до завершения процесса."""
+    server = server_cls(**kwargs)
+    connection.send(server.url)
+    server.serve_forever()
+
+
+class ServerProcess:
+    """Заглушка в отдельном процессе, чтобы не делить GIL с ботом."""
+
+    def __init__(self, server_cls, **kwargs):
+        """Параметры передаются конструктору сервера."""
+        parent, child = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(
+            target=serve, args=(server_cls, kwargs, child), daemon=True
+        )
+        self.process.start()
+        self.url = parent.recv()
+
+    def stats(self):
+        """Счётчики сервера."""
+        return requests.get(self.url + '/_stats', timeout=5).json()
+
+    def stop(self):
+        """Остановка процесса."""
+        self.process.terminate()
+        self.process.join()
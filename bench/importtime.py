@@ -0,0 +1,88 @@
+"""Бюджет времени импорта модуля по python -X importtime.
+
+Пример:
+    python -m bench.importtime --module homework --budget-ms 50
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+HEAVY_MODULES = ('requests', 'telebot', 'dotenv', 'http.server')
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def parse_args(argv=None):
+    """Параметры проверки."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--module', default='homework')
+    parser.add_argument('--budget-ms', type=float, default=50.0,
+                        help='порог времени импорта, мс')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='число замеров, берётся лучший')
+    parser.add_argument('--json', action='store_true',
+                        help='вывести отчёт в JSON')
+    return parser.parse_args(argv)
+
+
+def parse_importtime(output):
+    """Накопленное время импорта по модулям, мкс."""
+    times = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+def measure(module):
+    """Один импорт модуля в чистом интерпретаторе."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    return parse_importtime(result.stderr)
+
+
+def run(args):
+    """Замеры и отчёт."""
+    samples = [measure(args.module) for _ in range(args.repeat)]
+    best = min(samples, key=lambda times: times[args.module])
+    return {
+        'module': args.module,
+        'import_ms': round(best[args.module] / 1000, 2),
+        'heavy_modules': [name for name in HEAVY_MODULES if name in best],
+    }
+
+
+def check(report, args):
+    """Проверка бюджета; список нарушений."""
+    failures = []
+    if report['import_ms'] > args.budget_ms:
+        failures.append(f'import {report["module"]} '
+                        f'{report["import_ms"]} мс > {args.budget_ms} мс')
+    for name in report['heavy_modules']:
+        failures.append(f'import {report["module"]} загружает {name}')
+    return failures
+
+
+def main(argv=None):
+    """Запуск из командной строки."""
+    args = parse_args(argv)
+    report = run(args)
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False))
+    else:
+        for key, value in report.items():
+            print(f'{key:>14}: {value}')
+    failures = check(report, args)
+    for failure in failures:
+        print(f'FAIL: {failure}', file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
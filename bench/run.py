@@ -0,0 +1,176 @@
+"""Нагрузочный прогон бота против локальных заглушек API.
+
+Пример:
+    python -m bench.run --tenants 1000 --duration 30 --api-latency 0.05
+"""
+import argparse
+import asyncio
+from contextlib import suppress
+import json
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+
+from bench.fake_servers import FakePracticum, FakeTelegram, ServerProcess
+
+
+def parse_args(argv=None):
+    """Параметры прогона."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tenants', type=int, default=100)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--interval', type=float, default=1.0,
+                        help='период опроса одного получателя, с')
+    parser.add_argument('--max-in-flight', type=int, default=50)
+    parser.add_argument('--api-latency', type=float, default=0.0)
+    parser.add_argument('--api-error-rate', type=float, default=0.0)
+    parser.add_argument('--payload-size', type=int, default=3)
+    parser.add_argument('--change-rate', type=float, default=0.1)
+    parser.add_argument('--telegram-latency', type=float, default=0.0)
+    parser.add_argument('--telegram-error-rate', type=float, default=0.0)
+    parser.add_argument('--telegram-rate', type=float, default=30.0)
+    parser.add_argument('--json', action='store_true',
+                        help='вывести отчёт в JSON')
+    parser.add_argument('--min-polls-per-sec', type=float,
+                        help='порог: меньше — прогон провален')
+    parser.add_argument('--max-p99', type=float,
+                        help='порог p99 задержки запроса к API, с')
+    return parser.parse_args(argv)
+
+
+def total(counter, stage):
+    """Сумма счётчика этапа по всем исходам."""
+    return sum(value for key, value in counter.values.items()
+               if ('stage', stage) in key)
+
+
+async def drive(polling, duration):
+    """Работа движка в течение duration секунд.
+
+    Вернёт время работы до остановки: доотправка очереди после неё
+    в пропускную способность не входит.
+    """
+    task = asyncio.create_task(polling.run(drain_timeout=5))
+    started = time.perf_counter()
+    await asyncio.sleep(duration)
+    elapsed = time.perf_counter() - started
+    task.cancel()
+    with suppress(asyncio.CancelledError):
+        await task
+    return elapsed
+
+
+def stop_senders(polling, halt):
+    """Прервать паузы отправителей и дождаться их потоков."""
+    halt.set()
+    if polling is not None and polling.sender.executor is not None:
+        polling.sender.executor.shutdown(wait=True)
+
+
+def run(args):
+    """Прогон и отчёт."""
+    practicum = ServerProcess(
+        FakePracticum, latency=args.api_latency,
+        error_rate=args.api_error_rate, payload_size=args.payload_size,
+        change_rate=args.change_rate
+    )
+    telegram = ServerProcess(FakeTelegram, latency=args.telegram_latency,
+                             error_rate=args.telegram_error_rate)
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    os.environ.setdefault('LOG_SINKS', 'stderr')
+
+    import telebot
+
+    import engine
+    from homework import init
+    from metrics import stage_seconds, stage_total
+    from ratelimit import TelegramRateLimiter
+    from scheduler import PollScheduler
+    from storage import StateStore
+    from transport import PooledSession
+
+    init()
+    api_url = telebot.apihelper.API_URL
+    telebot.apihelper.API_URL = telegram.url + '/bot{0}/{1}'
+    tenants = [engine.Tenant(f'token{number}', str(number))
+               for number in range(args.tenants)]
+    halt = threading.Event()
+    polling = None
+    intervals = dict.fromkeys(('reviewing', 'rejected', 'approved'),
+                              args.interval)
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            polling = engine.PollingEngine(
+                telebot.TeleBot('1234:bench'), tenants,
+                max_in_flight=args.max_in_flight,
+                retry_period=args.interval,
+                session=PooledSession(pool_size=args.max_in_flight),
+                scheduler=PollScheduler(intervals,
+                                        default_interval=args.interval),
+                store=StateStore(os.path.join(directory, 'state.sqlite3')),
+                limiter=TelegramRateLimiter(global_rate=args.telegram_rate,
+                                            chat_rate=args.telegram_rate,
+                                            sleep=halt.wait),
+                endpoint=practicum.url + '/api/user_api/homework_statuses/',
+                halt=halt,
+            )
+            polls_before = total(stage_total, 'get_api_answer')
+            elapsed = asyncio.run(drive(polling, args.duration))
+            stop_senders(polling, halt)
+        messages = telegram.stats()['messages']
+    finally:
+        stop_senders(polling, halt)
+        telebot.apihelper.API_URL = api_url
+        practicum.stop()
+        telegram.stop()
+    polls = total(stage_total, 'get_api_answer') - polls_before
+    return {
+        'tenants': args.tenants,
+        'seconds': round(elapsed, 3),
+        'polls': polls,
+        'polls_per_sec': round(polls / elapsed, 2),
+        'notifications': messages,
+        'notifications_per_sec': round(messages / elapsed, 2),
+        'p50': stage_seconds.quantile(0.5, stage='get_api_answer',
+                                      outcome='ok'),
+        'p99': stage_seconds.quantile(0.99, stage='get_api_answer',
+                                      outcome='ok'),
+        'max_rss_mb': round(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1
+        ),
+    }
+
+
+def check(report, args):
+    """Проверка порогов; список нарушений."""
+    failures = []
+    if (args.min_polls_per_sec is not None
+            and report['polls_per_sec'] < args.min_polls_per_sec):
+        failures.append(f'polls/sec {report["polls_per_sec"]} < '
+                        f'{args.min_polls_per_sec}')
+    if (args.max_p99 is not None and report['p99'] is not None
+            and report['p99'] > args.max_p99):
+        failures.append(f'p99 {report["p99"]:.4f} > {args.max_p99}')
+    return failures
+
+
+def main(argv=None):
+    """Запуск из командной строки."""
+    args = parse_args(argv)
+    report = run(args)
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False))
+    else:
+        for key, value in report.items():
+            print(f'{key:>22}: {value}')
+    failures = check(report, args)
+    for failure in failures:
+        print(f'FAIL: {failure}', file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
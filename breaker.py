@@ -0,0 +1,101 @@
+import logging
+import threading
+import time
+
+from exceptions import (CircuitOpenError, DeadlineExceededError,
+                        IncorrectResponseCodeError)
+from metrics import registry
+
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RECOVERY_TIMEOUT = 60
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+logger = logging.getLogger(__name__)
+circuit_total = registry.counter(
+    'homework_circuit_total', 'Решения предохранителя API по исходу'
+)
+
+
+def is_endpoint_failure(error):
+    """Ошибка говорит о недоступности API, а не о проблеме токена."""
+    if isinstance(error, (ConnectionError, DeadlineExceededError)):
+        return True
+    if isinstance(error, IncorrectResponseCodeError):
+        return (error.status_code is None
+                or error.status_code >= 500)
+    return False
+
+
+class CircuitBreaker:
+    """Предохранитель перед API Практикума, общий для всех получателей.
+
+    После failure_threshold сбоев подряд цепь размыкается, и запросы
+    отклоняются без обращения к API. Через recovery_timeout пропускается
+    один пробный запрос: успех замыкает цепь, сбой снова размыкает.
+    """
+
+    def __init__(self, failure_threshold=DEFAULT_FAILURE_THRESHOLD,
+                 recovery_timeout=DEFAULT_RECOVERY_TIMEOUT,
+                 clock=time.monotonic):
+        """Цепь создаётся замкнутой."""
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0
+        self.lock = threading.Lock()
+
+    def allow(self):
+        """Можно ли выполнить запрос."""
+        with self.lock:
+            if self.state == CLOSED:
+                return True
+            if (self.state == OPEN
+                    and self.clock() - self.opened_at
+                    >= self.recovery_timeout):
+                self.state = HALF_OPEN
+                logger.info('Предохранитель API: пробный запрос')
+                return True
+            return False
+
+    def record_success(self):
+        """Успешный запрос замыкает цепь."""
+        with self.lock:
+            if self.state != CLOSED:
+                logger.warning('Предохранитель API: цепь замкнута')
+            self.state = CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        """Сбой API; при превышении порога цепь размыкается."""
+        with self.lock:
+            self.failures += 1
+            if (self.state == HALF_OPEN
+                    or self.failures >= self.failure_threshold):
+                if self.state != OPEN:
+                    logger.error('Предохранитель API: цепь разомкнута '
+                                 'после %s сбоев', self.failures)
+                self.state = OPEN
+                self.opened_at = self.clock()
+
+    def call(self, func, *args, **kwargs):
+        """Вызов через предохранитель."""
+        if not self.allow():
+            circuit_total.inc(result='rejected')
+            raise CircuitOpenError('API недоступен, запрос не отправлен')
+        try:
+            result = func(*args, **kwargs)
+        except Exception as error:
+            if is_endpoint_failure(error):
+                circuit_total.inc(result='failure')
+                self.record_failure()
+            else:
+                self.record_success()
+            raise
+        circuit_total.inc(result='success')
+        self.record_success()
+        return result
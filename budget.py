@@ -0,0 +1,167 @@
+from email.utils import parsedate_to_datetime
+from http import HTTPStatus
+import logging
+import threading
+import time
+
+from metrics import registry
+from ratelimit import TokenBucket
+
+PRACTICUM_RATE = 20
+DEFAULT_RETRY_AFTER = 60
+MAX_SLOWDOWN = 10
+MAX_PAUSE = 3600
+
+LIMIT_HEADERS = ('X-RateLimit-Limit', 'RateLimit-Limit')
+REMAINING_HEADERS = ('X-RateLimit-Remaining', 'RateLimit-Remaining')
+RESET_HEADERS = ('X-RateLimit-Reset', 'RateLimit-Reset')
+
+logger = logging.getLogger(__name__)
+budget_total = registry.counter(
+    'homework_api_budget_total', 'Запросы к API Практикума по бюджету'
+)
+
+
+def parse_retry_after(value, now=None):
+    """Секунды из Retry-After: число или HTTP-дата; None, если не разобрать."""
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    try:
+        moment = parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+    now = time.time() if now is None else now
+    return max(moment - now, 0)
+
+
+def parse_reset(value, now=None):
+    """Секунды до X-RateLimit-Reset: число секунд или epoch-время.
+
+    Значение больше текущего времени считается моментом сброса.
+    """
+    now = time.time() if now is None else now
+    if value > now:
+        value -= now
+    return min(max(value, 0), MAX_PAUSE)
+
+
+def header_number(headers, names):
+    """Первое числовое значение из заголовков names."""
+    for name in names:
+        value = headers.get(name)
+        if value is None:
+            continue
+        try:
+            return float(value)
+        except ValueError:
+            continue
+    return None
+
+
+class RequestBudget:
+    """Общий бюджет запросов к API Практикума.
+
+    Запросы выдаются ведром токенов с rate запросами в секунду. Ответ 429
+    с Retry-After и исчерпанный X-RateLimit-Remaining останавливают выдачу
+    до указанного времени. slowdown() — во сколько раз запланированный
+    спрос превышает бюджет; на столько планировщик растягивает интервалы
+    опроса, чтобы запросы не копились в ожидании токенов.
+    """
+
+    def __init__(self, rate=PRACTICUM_RATE, capacity=None,
+                 clock=time.monotonic):
+        """Бюджет задаётся в запросах в секунду."""
+        self.rate = rate
+        self.bucket = TokenBucket(rate, capacity, clock=clock)
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.granted = 0
+        self.delayed = 0
+        self.limited = 0
+        self.limit = None
+        self.remaining = None
+        self.stats_start = clock()
+        self.stats_granted = 0
+
+    def reserve(self):
+        """Забронировать запрос; вернуть, сколько секунд ждать."""
+        wait = self.bucket.reserve()
+        with self.lock:
+            self.granted += 1
+            self.stats_granted += 1
+            if wait > 0:
+                self.delayed += 1
+        budget_total.inc(result='delayed' if wait > 0 else 'granted')
+        return wait
+
+    def try_reserve(self):
+        """Взять запрос без ожидания; False, если пришлось бы ждать."""
+        if not self.bucket.take():
+            budget_total.inc(result='denied')
+            return False
+        with self.lock:
+            self.granted += 1
+            self.stats_granted += 1
+        budget_total.inc(result='granted')
+        return True
+
+    def pause(self, seconds):
+        """Остановить выдачу запросов на seconds секунд."""
+        logger.warning('Запросы к API приостановлены на %.0f с', seconds)
+        self.bucket.block(seconds)
+
+    def blocked_for(self):
+        """Сколько секунд ещё действует остановка после 429."""
+        return max(self.bucket.blocked_until - self.clock(), 0)
+
+    def observe(self, status_code, headers):
+        """Учёт кода ответа и заголовков лимита API."""
+        headers = headers or {}
+        limit = header_number(headers, LIMIT_HEADERS)
+        remaining = header_number(headers, REMAINING_HEADERS)
+        with self.lock:
+            if limit is not None:
+                self.limit = limit
+            if remaining is not None:
+                self.remaining = remaining
+        if status_code == HTTPStatus.TOO_MANY_REQUESTS:
+            with self.lock:
+                self.limited += 1
+            budget_total.inc(result='limited')
+            retry_after = parse_retry_after(headers.get('Retry-After'))
+            self.pause(DEFAULT_RETRY_AFTER if retry_after is None
+                       else min(retry_after, MAX_PAUSE))
+        elif remaining is not None and remaining <= 0:
+            reset = header_number(headers, RESET_HEADERS)
+            if reset:
+                self.pause(parse_reset(reset))
+
+    def slowdown(self, demand):
+        """Во сколько раз растянуть интервалы при спросе demand запросов/с."""
+        return min(max(demand / self.rate, 1), MAX_SLOWDOWN)
+
+    def stats(self):
+        """Загрузка бюджета с прошлого вызова; открывает новое окно."""
+        now = self.clock()
+        with self.lock:
+            elapsed = now - self.stats_start
+            used = self.stats_granted / elapsed if elapsed > 0 else 0.0
+            stats = {
+                'rate': self.rate,
+                'used': used,
+                'utilization': used / self.rate,
+                'granted': self.granted,
+                'delayed': self.delayed,
+                'limited': self.limited,
+                'server_utilization': (
+                    1 - self.remaining / self.limit
+                    if self.limit and self.remaining is not None else None
+                ),
+            }
+            self.stats_start = now
+            self.stats_granted = 0
+        return stats
@@ -0,0 +1,125 @@
+from collections import OrderedDict
+import hashlib
+import re
+import threading
+
+from metrics import registry
+
+DEFAULT_MAXSIZE = 10000
+CURRENT_DATE = re.compile(rb'"current_date"\s*:\s*(-?\d+)')
+
+cache_total = registry.counter(
+    'homework_response_cache_total', 'Обращения к кэшу ответов API по исходу'
+)
+
+
+def payload_digest(content):
+    """Хэш тела без current_date и само current_date.
+
+    current_date — время сервера, оно меняется в каждом ответе, поэтому
+    сравнивается только список работ.
+    """
+    match = CURRENT_DATE.search(content)
+    if match is None:
+        return hashlib.blake2b(content, digest_size=16).digest(), None
+    digest = hashlib.blake2b(content[:match.start()], digest_size=16)
+    digest.update(content[match.end():])
+    return digest.digest(), int(match.group(1))
+
+
+class CacheEntry:
+    """Закэшированный ответ API."""
+
+    __slots__ = ('from_date', 'etag', 'last_modified', 'digest', 'data')
+
+    def __init__(self, from_date, etag, last_modified, digest, data):
+        """Валидаторы ответа и уже разобранный JSON."""
+        self.from_date = from_date
+        self.etag = etag
+        self.last_modified = last_modified
+        self.digest = digest
+        self.data = data
+
+
+class ResponseCache:
+    """LRU-кэш ответов API статусов по токену.
+
+    С валидаторами прошлого ответа отправляются условные заголовки
+    (If-None-Match, If-Modified-Since); на 304 или на тело с тем же
+    списком работ возвращается уже разобранный ответ без повторного
+    json(), с current_date из нового тела.
+    """
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE):
+        """Кэш хранит не больше maxsize токенов."""
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token):
+        """Запись для токена."""
+        with self.lock:
+            entry = self.entries.get(token)
+            if entry is not None:
+                self.entries.move_to_end(token)
+            return entry
+
+    def conditional_headers(self, entry):
+        """Условные заголовки по валидаторам закэшированного ответа.
+
+        from_date сдвигается после каждого ответа, поэтому валидаторы
+        отправляются при любом from_date: решает сервер.
+        """
+        if entry is None:
+            return {}
+        headers = {}
+        if entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    def hit(self, result):
+        """Учёт попадания."""
+        with self.lock:
+            self.hits += 1
+        cache_total.inc(result=result)
+
+    def store(self, token, from_date, response):
+        """Разбор ответа с 200; при том же списке работ — данные из кэша."""
+        digest, current_date = payload_digest(response.content)
+        entry = self.get(token)
+        if entry is not None and entry.digest == digest:
+            entry.from_date = from_date
+            entry.etag = response.headers.get('ETag', entry.etag)
+            entry.last_modified = response.headers.get('Last-Modified',
+                                                       entry.last_modified)
+            if current_date is not None:
+                entry.data = dict(entry.data, current_date=current_date)
+            self.hit('unchanged')
+            return entry.data
+        data = response.json()
+        with self.lock:
+            self.misses += 1
+            self.entries[token] = CacheEntry(
+                from_date, response.headers.get('ETag'),
+                response.headers.get('Last-Modified'), digest, data
+            )
+            self.entries.move_to_end(token)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        cache_total.inc(result='miss')
+        return data
+
+    def stats(self):
+        """Попадания, промахи и доля попаданий."""
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self.entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'ratio': self.hits / total if total else 0.0,
+            }
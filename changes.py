@@ -0,0 +1,124 @@
+from datetime import datetime, timezone
+
+ACTIVE_STATUSES = ('reviewing', 'rejected', 'approved')
+DATE_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+WATERMARK_OVERLAP = 300
+
+
+def most_active(statuses):
+    """Самый «активный» статус из набора."""
+    statuses = set(statuses)
+    for status in ACTIVE_STATUSES:
+        if status in statuses:
+            return status
+    return None
+
+
+def parse_date(value):
+    """Unix-время из date_updated; None, если дату не разобрать."""
+    try:
+        return int(datetime.strptime(value, DATE_FORMAT)
+                   .replace(tzinfo=timezone.utc).timestamp())
+    except (TypeError, ValueError):
+        return None
+
+
+def earliest_date(dates):
+    """Самая ранняя из дат date_updated в unix-времени или None."""
+    return min(filter(None, map(parse_date, dates)), default=None)
+
+
+def next_watermark(response, watermark, since=None):
+    """Отметка времени после проверенного ответа API.
+
+    Сдвигается к current_date, но не дальше since — даты самой ранней
+    ещё не доставленной работы.
+    """
+    current_date = response.get('current_date')
+    if not isinstance(current_date, int):
+        return watermark
+    return current_date if since is None else min(current_date, since)
+
+
+def from_date(watermark, overlap=WATERMARK_OVERLAP):
+    """Параметр from_date запроса: отметка с перекрытием.
+
+    Работы из перекрытия, которые уже доставлены, отсеивает ChangeIndex.
+    """
+    return max(watermark - overlap, 0)
+
+
+def homework_key(homework):
+    """Ключ работы: id, а если его нет — название."""
+    return str(homework.get('id') or homework.get('homework_name'))
+
+
+def homework_version(homework):
+    """Версия работы: ключ, статус и дата обновления."""
+    return (homework_key(homework), homework.get('status'),
+            homework.get('date_updated'))
+
+
+class ChangeIndex:
+    """Последние известные статус и date_updated каждой работы.
+
+    diff() за один проход по списку homeworks возвращает только те работы,
+    у которых сменился статус или дата обновления; сообщения строятся
+    только для них. Версии, которые уже отправляются, повторно не выдаются.
+    """
+
+    def __init__(self, known=None):
+        """Известные работы: ключ -> (status, date_updated)."""
+        self.known = dict(known or {})
+        self.pending = set()
+
+    def __len__(self):
+        """Число известных работ."""
+        return len(self.known)
+
+    def is_changed(self, homework):
+        """Отличается ли работа от последней доставленной версии."""
+        known = self.known.get(homework_key(homework))
+        if known is None:
+            return True
+        status, date_updated = known
+        if homework.get('status') != status:
+            return True
+        return bool(date_updated and homework.get('date_updated')
+                    and homework.get('date_updated') != date_updated)
+
+    def diff(self, homeworks):
+        """Изменившиеся работы из ответа API."""
+        return [homework for homework in homeworks
+                if homework_version(homework) not in self.pending
+                and self.is_changed(homework)]
+
+    def begin(self, homework):
+        """Версия работы поставлена в очередь на отправку."""
+        self.pending.add(homework_version(homework))
+
+    def release(self, homework):
+        """Отправка не удалась, версию можно выдать снова."""
+        self.pending.discard(homework_version(homework))
+
+    def commit(self, homework):
+        """Запоминаем доставленную версию работы."""
+        self.pending.discard(homework_version(homework))
+        self.known[homework_key(homework)] = (homework.get('status'),
+                                              homework.get('date_updated'))
+
+    def pending_since(self):
+        """Дата самой ранней отправляемой версии в unix-времени или None."""
+        return earliest_date(
+            date_updated for _, _, date_updated in self.pending
+        )
+
+    def last_updated(self):
+        """Дата последнего доставленного изменения в unix-времени или None."""
+        return max(filter(None, (parse_date(date_updated)
+                                 for _, date_updated in self.known.values())),
+                   default=None)
+
+    def summary_status(self):
+        """Самый «активный» статус среди всех работ получателя."""
+        return most_active(status for status, _ in self.known.values())
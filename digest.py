@@ -0,0 +1,126 @@
+import asyncio
+from collections import Counter
+from functools import partial
+import logging
+
+from metrics import registry
+
+DEFAULT_WINDOW = 5
+MESSAGE_LIMIT = 4096
+SEPARATOR = '\n\n'
+
+logger = logging.getLogger(__name__)
+digest_total = registry.counter(
+    'homework_digest_total', 'Сообщения о статусах до и после объединения'
+)
+
+
+def split_digest(texts, limit=MESSAGE_LIMIT, separator=SEPARATOR):
+    """Склейка текстов в сообщения не длиннее limit.
+
+    Возвращает пары (текст сообщения, номера вошедших в него текстов).
+    Текст длиннее limit режется на несколько сообщений.
+    """
+    chunks = []
+    for number, text in enumerate(texts):
+        pieces = [text[start:start + limit]
+                  for start in range(0, len(text), limit)] or ['']
+        for piece in pieces:
+            if (chunks and len(chunks[-1][0]) + len(separator)
+                    + len(piece) <= limit):
+                chunks[-1][0] += separator + piece
+                chunks[-1][1].add(number)
+            else:
+                chunks.append([piece, {number}])
+    return [(text, numbers) for text, numbers in chunks]
+
+
+class DigestDelivery:
+    """Результаты отправки сводки по исходным сообщениям.
+
+    callback исходного сообщения вызывается, когда отправлены все сводки,
+    в которые оно вошло; успех — только если успешны все они.
+    """
+
+    def __init__(self, callbacks, chunks):
+        """Ждём по одному результату на каждую сводку с сообщением."""
+        self.callbacks = callbacks
+        self.remaining = Counter(
+            number for _, numbers in chunks for number in numbers
+        )
+        self.ok = [True] * len(callbacks)
+
+    def done(self, numbers, ok):
+        """Результат отправки одной сводки."""
+        for number in numbers:
+            self.ok[number] = self.ok[number] and ok
+            self.remaining[number] -= 1
+            callback = self.callbacks[number]
+            if not self.remaining[number] and callback is not None:
+                callback(self.ok[number])
+
+
+class DigestQueue:
+    """Окно объединения сообщений о статусах для каждого чата.
+
+    Первое сообщение открывает окно в window секунд; всё, что пришло
+    в этот чат за окно, уходит одной сводкой через submit с учётом лимита
+    длины сообщения Telegram.
+    """
+
+    def __init__(self, submit, window=DEFAULT_WINDOW, limit=MESSAGE_LIMIT):
+        """submit(chat_id, text, callback, key) — постановка в очередь."""
+        self.submit = submit
+        self.window = window
+        self.limit = limit
+        self.pending = {}
+        self.timers = {}
+        self.tasks = set()
+
+    def __len__(self):
+        """Число сообщений, ждущих сводки."""
+        return sum(map(len, self.pending.values()))
+
+    async def add(self, chat_id, text, callback=None, key=None):
+        """Добавить сообщение в сводку чата.
+
+        Ключ сводки собирается из ключей её сообщений, если они есть у всех.
+        """
+        self.pending.setdefault(chat_id, []).append((text, callback, key))
+        if chat_id not in self.timers:
+            self.timers[chat_id] = asyncio.get_running_loop().call_later(
+                self.window, self.schedule_flush, chat_id
+            )
+
+    def schedule_flush(self, chat_id):
+        """Окно чата закрылось."""
+        task = asyncio.ensure_future(self.flush(chat_id))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def flush(self, chat_id):
+        """Отправка сводки чата."""
+        timer = self.timers.pop(chat_id, None)
+        if timer is not None:
+            timer.cancel()
+        items = self.pending.pop(chat_id, [])
+        if not items:
+            return
+        chunks = split_digest([text for text, _, _ in items], self.limit)
+        logger.debug('Сводка для чата %s: %s сообщений в %s',
+                     chat_id, len(items), len(chunks))
+        digest_total.inc(len(items), stage='queued')
+        digest_total.inc(len(chunks), stage='sent')
+        delivery = DigestDelivery([callback for _, callback, _ in items],
+                                  chunks)
+        for text, numbers in chunks:
+            keys = [items[number][2] for number in sorted(numbers)]
+            await self.submit(chat_id, text, partial(delivery.done, numbers),
+                              '+'.join(keys) if all(keys) else None)
+
+    async def flush_all(self):
+        """Отправка всех сводок, не дожидаясь окон."""
+        for chat_id in list(self.pending):
+            await self.flush(chat_id)
+        if self.tasks:
+            await asyncio.gather(*self.tasks, return_exceptions=True)
@@ -0,0 +1,783 @@
+import asyncio
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import suppress
+from functools import partial
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+from budget import PRACTICUM_RATE, RequestBudget
+from breaker import (DEFAULT_FAILURE_THRESHOLD, DEFAULT_RECOVERY_TIMEOUT,
+                     CircuitBreaker)
+from cache import DEFAULT_MAXSIZE, ResponseCache
+from changes import (WATERMARK_OVERLAP, ChangeIndex, from_date, homework_key,
+                     homework_version, most_active, next_watermark)
+from exceptions import (CircuitOpenError, DeadlineExceededError,
+                        NotTokenError, RateLimitedError)
+from homework import (ENDPOINT, RETRY_PERIOD, check_response, get_headers,
+                      init, parse_status, post_to_chat, request_statuses,
+                      send_to_chat)
+from digest import DEFAULT_WINDOW, DigestQueue
+from hedging import DEFAULT_QUANTILE, Hedger
+from incidents import IncidentTracker
+from metrics import DEFAULT_PORT, start_metrics_server
+from preflight import DEFAULT_CONCURRENCY, preflight
+from ratelimit import (TELEGRAM_CHAT_RATE, TELEGRAM_GLOBAL_RATE,
+                       TelegramRateLimiter)
+from retry import (AMBIGUOUS, CHAT_GONE, DEFAULT_ATTEMPTS, DEFAULT_BASE_DELAY,
+                   DEFAULT_MAX_DELAY, FINAL, DeliveryLog, RetryPolicy,
+                   Undelivered, dedup_key)
+from scheduler import (DEFAULT_COLD_AFTER, DEFAULT_COLD_INTERVAL,
+                       PollScheduler)
+from sender import DEFAULT_QUEUE_SIZE, DEFAULT_WORKERS, SenderPool
+from shutdown import DEFAULT_GRACE_PERIOD, SIGNALS
+from storage import DEFAULT_BATCH_SIZE, DEFAULT_PATH, StateStore
+from transport import PooledSession
+
+DEFAULT_MAX_IN_FLIGHT = 50
+DEFAULT_POLL_DEADLINE = 30
+POLL_TICK = 1
+STATS_PERIOD = 60
+BUDGET_WARNING = 0.9
+REDELIVERY_DELAY = 60
+REDELIVERY_MAX_DELAY = 3600
+REDELIVERY_ATTEMPTS = 5
+
+
+class Tenant(namedtuple('Tenant', ('token', 'chat_id'))):
+    """Получатель: токен Практикума и id чата."""
+
+    __slots__ = ()
+
+    @property
+    def key(self):
+        """Ключ получателя в хранилище без самого токена."""
+        return hashlib.sha256(
+            f'{self.token}:{self.chat_id}'.encode()
+        ).hexdigest()[:32]
+
+
+logger = logging.getLogger(__name__)
+
+
+def load_tenants(path=None):
+    """Загрузка списка получателей.
+
+    Файл со списком задаётся переменной TENANTS_FILE и содержит JSON-массив
+    объектов с ключами token и chat_id. Без файла используется одна пара
+    PRACTICUM_TOKEN и TELEGRAM_CHAT_ID.
+    """
+    path = path or os.getenv('TENANTS_FILE')
+    if not path:
+        return [Tenant(os.getenv('PRACTICUM_TOKEN'),
+                       os.getenv('TELEGRAM_CHAT_ID'))]
+    with open(path, encoding='utf-8') as file:
+        return [Tenant(str(item['token']), str(item['chat_id']))
+                for item in json.load(file)]
+
+
+def group_by_token(tenants):
+    """Подписки: токен -> получатели, которые на него подписаны."""
+    subscriptions = {}
+    for tenant in tenants:
+        subscriptions.setdefault(tenant.token, []).append(tenant)
+    return subscriptions
+
+
+def check_tenants(tenants):
+    """Проверка, что у каждого получателя есть токен и id чата."""
+    broken = [number for number, tenant in enumerate(tenants)
+              if not tenant.token or not tenant.chat_id]
+    if not tenants or broken:
+        message = f'Некорректные получатели в списке: {broken}'
+        logger.critical(message)
+        raise NotTokenError(message)
+
+
+class TenantState:
+    """Состояние опроса одного получателя."""
+
+    def __init__(self, timestamp=0, known=None):
+        """По умолчанию начинаем с полной истории."""
+        self.timestamp = timestamp
+        self.index = ChangeIndex(known)
+        self.incidents = IncidentTracker()
+
+    @property
+    def status(self):
+        """Статус, по которому планируется следующий опрос."""
+        return self.index.summary_status()
+
+
+class DeliveryResults(list):
+    """Результаты отправки изменений одного ответа API."""
+
+    def __init__(self, expected):
+        """Ждём expected результатов."""
+        super().__init__()
+        self.expected = expected
+
+
+class PollingEngine:
+    """Опрос API для множества получателей в одном цикле событий."""
+
+    def __init__(self, bot, tenants, max_in_flight=DEFAULT_MAX_IN_FLIGHT,
+                 retry_period=RETRY_PERIOD, session=None, scheduler=None,
+                 store=None, limiter=None, sender_workers=DEFAULT_WORKERS,
+                 send_queue_size=DEFAULT_QUEUE_SIZE, endpoint=None,
+                 cache=None, breaker=None,
+                 poll_deadline=DEFAULT_POLL_DEADLINE, hedger=None,
+                 overlap=WATERMARK_OVERLAP, digest_window=0, retry=None,
+                 budget=None, halt=None):
+        """Число одновременных запросов ограничено max_in_flight.
+
+        halt — событие остановки отправителей; его wait служит паузой
+        для повторов и ограничителя частоты, чтобы остановка их прерывала.
+        """
+        self.bot = bot
+        self.budget = budget
+        self.retry = retry
+        self.deliveries = DeliveryLog()
+        self.disabled = set()
+        self.redelivery_delay = REDELIVERY_DELAY
+        self.redeliveries = set()
+        self.breaker = breaker
+        self.poll_deadline = poll_deadline
+        self.overlap = overlap
+        self.hedger = hedger
+        self.endpoint = endpoint
+        self.cache = cache
+        self.limiter = limiter
+        self.sender = SenderPool(self.send, workers=sender_workers,
+                                 maxsize=send_queue_size, halt=halt)
+        self.digest = None
+        if digest_window:
+            self.digest = DigestQueue(self.sender.submit, digest_window)
+        self.session = session
+        self.store = store
+        if scheduler is None:
+            scheduler = PollScheduler(default_interval=retry_period)
+        self.scheduler = scheduler
+        self.tenants = list(tenants)
+        self.subscriptions = group_by_token(self.tenants)
+        self.states = {}
+        self.max_in_flight = max_in_flight
+        self.retry_period = retry_period
+        self.stopping = asyncio.Event()
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_in_flight * 2 if hedger else max_in_flight
+        )
+
+    async def call(self, func, *args):
+        """Вызов блокирующей функции в пуле потоков движка."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+
+    def fetch(self, token, timestamp, deadline=None):
+        """Блокирующий запрос статусов через предохранитель API."""
+        request = partial(request_statuses, timestamp, get_headers(token),
+                          self.session, self.endpoint, self.cache, deadline,
+                          self.budget)
+        if self.breaker is None:
+            return request()
+        return self.breaker.call(request)
+
+    def start_fetch(self, token, timestamp, deadline):
+        """Запрос статусов в пуле потоков; возвращает future."""
+        loop = asyncio.get_running_loop()
+        return loop.run_in_executor(self.executor, self.fetch, token,
+                                    timestamp, deadline)
+
+    def start_hedge(self, token, timestamp, deadline):
+        """Дублирующий запрос, если бюджет даёт его без ожидания.
+
+        Иначе None: дубль не должен ждать бюджет или обходить паузу
+        после 429.
+        """
+        if self.budget is not None and not self.budget.try_reserve():
+            return None
+        return self.start_fetch(token, timestamp, deadline)
+
+    async def fetch_before(self, token, timestamp, deadline):
+        """Запрос статусов, который не выходит за крайний срок опроса.
+
+        С Hedger медленный запрос дублируется, если позволяет бюджет;
+        поток зависшего запроса освободится по таймауту чтения.
+        """
+        start = partial(self.start_fetch, token, timestamp, deadline)
+        request = (self.hedger.run(start, partial(self.start_hedge, token,
+                                                  timestamp, deadline))
+                   if self.hedger else start())
+        try:
+            return await asyncio.wait_for(request,
+                                          deadline - time.monotonic())
+        except asyncio.TimeoutError:
+            raise DeadlineExceededError(
+                f'Опрос API не уложился в {self.poll_deadline} с.'
+            )
+
+    def state(self, tenant):
+        """Состояние получателя, при первом обращении — из хранилища."""
+        state = self.states.get(tenant)
+        if state is None:
+            if self.store is None:
+                state = TenantState()
+            else:
+                state = TenantState(self.store.get_watermark(tenant.key),
+                                    self.store.get_statuses(tenant.key))
+            self.states[tenant] = state
+        return state
+
+    def save(self, tenant, state, homework):
+        """Запоминаем доставленную версию работы."""
+        state.index.commit(homework)
+        if self.store is not None:
+            self.store.set_status(tenant.key, homework_key(homework),
+                                  homework.get('status'),
+                                  homework.get('date_updated'))
+
+    def advance(self, tenant, state, response):
+        """Сдвигаем отметку времени по проверенному ответу.
+
+        Отметка не уходит дальше date_updated работ, которые ещё
+        отправляются, чтобы при сбое отправки они пришли снова.
+        """
+        state.timestamp = next_watermark(response, state.timestamp,
+                                         state.index.pending_since())
+        if self.store is not None:
+            self.store.set_watermark(tenant.key, state.timestamp)
+
+    def send(self, chat_id, message, key=None):
+        """Блокирующая отправка через ограничитель частоты.
+
+        С RetryPolicy временные ошибки повторяются. Сообщение, на которое
+        Telegram не ответил, считается доставленным: оно могло дойти,
+        а ключ уведомления key не даёт отправить его снова. Чат,
+        недоступный боту, отключается.
+        """
+        if self.store is not None:
+            self.store.sync()
+        if self.retry is None:
+            return send_to_chat(self.bot, chat_id, message, self.limiter)
+        if key is not None and key in self.deliveries:
+            logger.warning('Уведомление уже отправлено в чат %s, '
+                           'повтор пропущен', chat_id)
+            return True
+        kind = self.retry.call(partial(post_to_chat, self.bot, chat_id,
+                                       message, self.limiter))
+        if kind is None:
+            return True
+        if kind == AMBIGUOUS:
+            if key is not None:
+                self.deliveries.add(key)
+            return True
+        if kind == CHAT_GONE:
+            self.disable(chat_id)
+        return Undelivered(kind)
+
+    def disable(self, chat_id):
+        """Отключение чата, в который бот больше не может писать."""
+        if chat_id not in self.disabled:
+            logger.error('Чат %s недоступен боту, получатель отключён',
+                         chat_id)
+            self.disabled.add(chat_id)
+
+    def active(self, tenants):
+        """Получатели, чаты которых не отключены."""
+        return [tenant for tenant in tenants
+                if tenant.chat_id not in self.disabled]
+
+    async def notify(self, tenant, state, error):
+        """Одно сообщение об ошибке на инцидент."""
+        message = state.incidents.failure(error, self.endpoint or ENDPOINT)
+        if message is None:
+            return
+
+        def delivered(ok):
+            if not ok:
+                state.incidents.undelivered()
+
+        await self.sender.submit(tenant.chat_id, message, delivered)
+
+    async def notify_recovered(self, tenant, state):
+        """Сообщение о восстановлении после инцидента."""
+        message = state.incidents.recovered()
+        if message is not None:
+            await self.sender.submit(tenant.chat_id, message)
+
+    async def submit_status(self, chat_id, message, callback, key=None):
+        """Сообщение о статусе: в сводку чата или сразу в очередь."""
+        if self.digest is None:
+            await self.sender.submit(chat_id, message, callback, key)
+        else:
+            await self.digest.add(chat_id, message, callback, key)
+
+    async def shutdown_sender(self, timeout=DEFAULT_GRACE_PERIOD):
+        """Отправка незакрытых сводок и остановка отправителей.
+
+        Подтверждения уже отправленных уведомлений фиксируются сразу,
+        не дожидаясь потоков, которые не успели отправить своё.
+        """
+        if self.digest is not None and self.sender.running:
+            await self.digest.flush_all()
+        await self.sender.shutdown(timeout)
+        if self.store is not None:
+            self.store.flush()
+
+    def record(self, tenant, homework, message):
+        """Запись уведомления в outbox до отправки."""
+        if self.store is None:
+            return None
+        return self.store.add_outbox(tenant.key, tenant.chat_id, message,
+                                     homework_key(homework),
+                                     homework.get('status'),
+                                     homework.get('date_updated'))
+
+    def acknowledge(self, tenant, state, homework, outbox_id, message,
+                    attempt, ok):
+        """Итог отправки уведомления о статусе.
+
+        Запись outbox удаляется после доставки и после окончательной
+        ошибки: чат недоступен или Telegram отклонил сообщение. После
+        временной ошибки уведомление отправляется снова с растущей паузой,
+        не дожидаясь повторного опроса; после REDELIVERY_ATTEMPTS попыток
+        работа возвращается в окно опроса.
+        """
+        if ok:
+            self.save(tenant, state, homework)
+        elif (outbox_id is not None and getattr(ok, 'kind', None) not in FINAL
+              and attempt + 1 < REDELIVERY_ATTEMPTS):
+            self.redeliver(tenant, state, homework, outbox_id, message,
+                           attempt + 1)
+            return
+        else:
+            state.index.release(homework)
+        if outbox_id is not None:
+            self.store.delete_outbox(outbox_id)
+
+    def redeliver(self, tenant, state, homework, outbox_id, message,
+                  attempt):
+        """Повтор уведомления из outbox через паузу."""
+        delay = min(self.redelivery_delay * 2 ** (attempt - 1),
+                    REDELIVERY_MAX_DELAY)
+        logger.warning('Уведомление в чат %s не доставлено, повтор через '
+                       '%.0f с', tenant.chat_id, delay)
+        asyncio.get_running_loop().call_later(
+            delay, self.resubmit, tenant, state, homework, outbox_id,
+            message, attempt
+        )
+
+    def resubmit(self, tenant, state, homework, outbox_id, message, attempt):
+        """Постановка уведомления в очередь снова.
+
+        После остановки запись остаётся в outbox до следующего запуска.
+        """
+        if self.stopping.is_set() or not self.sender.running:
+            return
+        task = asyncio.ensure_future(self.submit_status(
+            tenant.chat_id, message, partial(
+                self.acknowledge, tenant, state, homework, outbox_id,
+                message, attempt
+            ), dedup_key(tenant.key, homework)
+        ))
+        self.redeliveries.add(task)
+        task.add_done_callback(self.redeliveries.discard)
+
+    async def replay_outbox(self):
+        """Повторная отправка уведомлений, не подтверждённых до остановки.
+
+        Записи чужих получателей не трогаем: базу могут делить несколько
+        движков, и эти записи отправит их владелец.
+        """
+        if self.store is None:
+            return
+        tenants = {tenant.key: tenant for tenant in self.tenants}
+        rows = [row for row in self.store.get_outbox() if row[1] in tenants]
+        if rows:
+            logger.warning('Повторная отправка %s уведомлений из outbox',
+                           len(rows))
+        for (outbox_id, key, chat_id, homework_id, status, date_updated,
+             message) in rows:
+            tenant = tenants[key]
+            state = self.state(tenant)
+            homework = {'id': homework_id, 'status': status,
+                        'date_updated': date_updated}
+            state.index.begin(homework)
+            await self.submit_status(chat_id, message, partial(
+                self.acknowledge, tenant, state, homework, outbox_id,
+                message, 0
+            ), dedup_key(key, homework))
+
+    def delivered(self, tenant, state, response, results, homework,
+                  outbox_id, message, ok):
+        """Результат отправки одного изменения.
+
+        Отметка времени сдвигается, когда доставлены все изменения ответа.
+        """
+        self.acknowledge(tenant, state, homework, outbox_id, message, 0, ok)
+        results.append(ok)
+        if len(results) == results.expected and all(results):
+            self.advance(tenant, state, response)
+
+    async def deliver_changes(self, tenant, state, response, changes,
+                              rendered=None):
+        """Постановка изменений в очередь отправки.
+
+        Отметка времени сразу сдвигается до самой ранней из отправляемых
+        работ, а после доставки всех — до current_date.
+
+        Сообщения, уже собранные для других чатов того же токена, берутся
+        из rendered.
+        """
+        if not changes:
+            logger.debug('Новых статусов нет.')
+            self.advance(tenant, state, response)
+            return
+        rendered = {} if rendered is None else rendered
+        messages = []
+        for homework in changes:
+            version = homework_version(homework)
+            if version not in rendered:
+                rendered[version] = parse_status(homework)
+            messages.append((homework, rendered[version]))
+        results = DeliveryResults(len(messages))
+        for homework, _ in messages:
+            state.index.begin(homework)
+        self.advance(tenant, state, response)
+        for homework, message in messages:
+            outbox_id = self.record(tenant, homework, message)
+            await self.submit_status(tenant.chat_id, message, partial(
+                self.delivered, tenant, state, response, results, homework,
+                outbox_id, message
+            ), dedup_key(tenant.key, homework))
+
+    async def wait_budget(self):
+        """Дождаться своей очереди в бюджете запросов к API."""
+        if self.budget is not None:
+            await asyncio.sleep(self.budget.reserve())
+
+    async def poll_token(self, token, semaphore, tenants=None):
+        """Один запрос к API на токен и рассылка всем его подписчикам.
+
+        Запрос идёт с самой ранней отметкой времени среди подписчиков;
+        уже доставленные каждому чату версии отсеивает его ChangeIndex.
+        """
+        tenants = self.active(self.subscriptions[token] if tenants is None
+                              else tenants)
+        if not tenants:
+            return
+        states = [self.state(tenant) for tenant in tenants]
+        await self.wait_budget()
+        async with semaphore:
+            try:
+                response = await self.fetch_before(
+                    token, from_date(min(state.timestamp for state in states),
+                                     self.overlap),
+                    time.monotonic() + self.poll_deadline
+                )
+                homeworks = check_response(response)
+            except CircuitOpenError as error:
+                logger.debug('Опрос пропущен: %s', error)
+                return
+            except RateLimitedError as error:
+                logger.warning('Опрос отложен: %s', error)
+                return
+            except Exception as error:
+                logger.error('Сбой в работе программы: %s', error)
+                for tenant, state in zip(tenants, states):
+                    await self.notify(tenant, state, error)
+                return
+            rendered = {}
+            for tenant, state in zip(tenants, states):
+                try:
+                    await self.notify_recovered(tenant, state)
+                    await self.deliver_changes(
+                        tenant, state, response,
+                        state.index.diff(homeworks), rendered
+                    )
+                except Exception as error:
+                    logger.error('Сбой в работе программы: %s', error)
+                    await self.notify(tenant, state, error)
+
+    def token_status(self, token):
+        """Статус, по которому планируется следующий опрос токена."""
+        return most_active(self.state(tenant).status
+                           for tenant in self.subscriptions[token])
+
+    def token_updated(self, token):
+        """Последнее изменение статуса у подписчиков токена."""
+        return max(filter(None, (self.state(tenant).index.last_updated()
+                                 for tenant in self.subscriptions[token])),
+                   default=None)
+
+    def plan(self, token):
+        """Следующий опрос токена по уровню активности подписчиков."""
+        if not self.active(self.subscriptions[token]):
+            self.scheduler.remove(token)
+            return
+        self.scheduler.reschedule(token, self.token_status(token),
+                                  self.token_updated(token))
+
+    async def run_cycle(self, tenants=None):
+        """Опрос получателей: один запрос на токен."""
+        subscriptions = (self.subscriptions if tenants is None
+                         else group_by_token(tenants))
+        semaphore = asyncio.Semaphore(self.max_in_flight)
+        await asyncio.gather(
+            *(self.poll_token(token, semaphore, subscribers)
+              for token, subscribers in subscriptions.items())
+        )
+        self.log_stats()
+
+    def log_stats(self):
+        """Статистика соединений и отправки в лог."""
+        if self.session is not None:
+            logger.debug('Соединения с API: %(requests)s запросов, '
+                         '%(connections)s соединений, %(reused)s повторных '
+                         'использований', self.session.stats())
+        if self.limiter is not None:
+            logger.debug('Отправка в Telegram: ждут %(waiting)s, '
+                         'задержано %(throttled)s из %(acquired)s, '
+                         'среднее ожидание %(avg_wait).3f с, '
+                         'максимальное %(max_wait).3f с',
+                         self.limiter.stats())
+        if self.cache is not None:
+            logger.debug('Кэш ответов API: %(size)s записей, '
+                         '%(hits)s попаданий, %(misses)s промахов, '
+                         'доля попаданий %(ratio).2f', self.cache.stats())
+        logger.debug('Уровни опроса: %(hot)s hot, %(warm)s warm, '
+                     '%(cold)s cold', self.scheduler.tier_counts())
+        if self.budget is not None:
+            self.log_budget()
+
+    def log_budget(self):
+        """Загрузка бюджета запросов к API в лог."""
+        stats = self.budget.stats()
+        stats['demand'] = self.scheduler.demand
+        stats['slowdown'] = self.scheduler.slowdown
+        stats['percent'] = stats['utilization'] * 100
+        level = (logging.WARNING if stats['utilization'] >= BUDGET_WARNING
+                 else logging.DEBUG)
+        logger.log(level, 'Бюджет API: %(used).2f из %(rate)s запросов/с '
+                   '(%(percent).0f%%), по расписанию %(demand).2f/с, '
+                   'интервалы растянуты в %(slowdown).2f раза, '
+                   'отложено %(delayed)s, ответов 429: %(limited)s', stats)
+
+    def pace(self):
+        """Темп опроса по бюджету API; вернёт паузу после 429 или 0."""
+        if self.budget is None:
+            return 0
+        self.scheduler.slowdown = self.budget.slowdown(self.scheduler.demand)
+        return self.budget.blocked_for()
+
+    async def poll_once(self, tenants=None):
+        """Один опрос получателей с доставкой всех сообщений."""
+        self.sender.start()
+        try:
+            await self.run_cycle(tenants)
+        finally:
+            await self.shutdown_sender()
+
+    async def poll_scheduled(self, token, semaphore):
+        """Опрос по расписанию и планирование следующего."""
+        try:
+            await self.poll_token(token, semaphore)
+        finally:
+            self.plan(token)
+
+    def stop(self):
+        """Мягкая остановка: новые опросы больше не запускаются."""
+        if not self.stopping.is_set():
+            logger.info('Остановка опроса')
+        self.stopping.set()
+
+    async def drain(self, polls, timeout):
+        """Доделать начатые опросы и отправить очередь за timeout секунд."""
+        deadline = time.monotonic() + timeout
+        if polls:
+            logger.info('Ждём завершения %s опросов', len(polls))
+            await asyncio.wait(polls, timeout=timeout)
+        await self.shutdown_sender(max(deadline - time.monotonic(), 0))
+
+    async def run(self, drain_timeout=DEFAULT_GRACE_PERIOD):
+        """Цикл опроса по расписанию до вызова stop().
+
+        Расписание ведётся по токенам, первые опросы разносятся по
+        интервалу по умолчанию, не читая состояние получателей; уровень
+        активности определяется после первого опроса токена. С бюджетом API
+        интервалы растягиваются, если расписание требует больше запросов,
+        чем позволяет бюджет, а после 429 опросы не запускаются до конца
+        Retry-After. Наступившие опросы
+        запускаются сразу, не дожидаясь предыдущих; параллельность
+        ограничивает общий семафор.
+        После stop() начатые опросы и очередь отправки доделываются
+        за drain_timeout секунд, затем состояние сохраняется.
+        """
+        self.scheduler.spread(self.subscriptions)
+        self.sender.start()
+        await self.replay_outbox()
+        semaphore = asyncio.Semaphore(self.max_in_flight)
+        polls = set()
+        last_stats = time.monotonic()
+        try:
+            while not self.stopping.is_set():
+                paused = self.pace()
+                for token in () if paused else self.scheduler.pop_due():
+                    poll = asyncio.create_task(
+                        self.poll_scheduled(token, semaphore)
+                    )
+                    polls.add(poll)
+                    poll.add_done_callback(polls.discard)
+                if self.store is not None:
+                    self.store.maybe_flush()
+                if time.monotonic() - last_stats >= STATS_PERIOD:
+                    self.log_stats()
+                    last_stats = time.monotonic()
+                with suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(
+                        self.stopping.wait(),
+                        min(paused, POLL_TICK) if paused
+                        else self.scheduler.next_delay(POLL_TICK)
+                    )
+            await self.drain(set(polls), drain_timeout)
+        finally:
+            for poll in polls:
+                poll.cancel()
+            await asyncio.gather(*polls, return_exceptions=True)
+            await self.shutdown_sender(drain_timeout)
+            self.executor.shutdown(wait=False)
+            if self.session is not None:
+                self.session.close()
+            if self.store is not None:
+                self.store.close()
+
+
+async def serve(polling, grace_period=DEFAULT_GRACE_PERIOD):
+    """Работа движка до SIGTERM или SIGINT с мягкой остановкой."""
+    loop = asyncio.get_running_loop()
+    for signum in SIGNALS:
+        loop.add_signal_handler(signum, polling.stop)
+    await polling.run(grace_period)
+
+
+def check_telegram_token():
+    """Токен бота из окружения."""
+    telegram_token = os.getenv('TELEGRAM_TOKEN')
+    if not telegram_token:
+        message = 'Отсутствуют переменные среды: TELEGRAM_TOKEN'
+        logger.critical(message)
+        raise NotTokenError(message)
+    return telegram_token
+
+
+def check_preflight(tenants):
+    """Карантин получателей с отклонёнными токенами и недоступными чатами.
+
+    Проверка выполняется параллельно, не больше PREFLIGHT_CONCURRENCY
+    запросов сразу; 0 отключает её.
+    """
+    from telebot import TeleBot
+
+    concurrency = int(os.getenv('PREFLIGHT_CONCURRENCY', DEFAULT_CONCURRENCY))
+    if not concurrency:
+        return tenants
+    report = asyncio.run(preflight(
+        tenants, TeleBot(token=check_telegram_token()), concurrency,
+        endpoint=os.getenv('PRACTICUM_ENDPOINT'),
+        budget=RequestBudget(float(os.getenv('PRACTICUM_RATE',
+                                             PRACTICUM_RATE)))
+    ))
+    if not report.valid:
+        message = 'Все получатели на карантине: ' + report.summary()
+        logger.critical(message)
+        raise NotTokenError(message)
+    return report.valid
+
+
+def build_engine(tenants, shards=1):
+    """Движок по настройкам из окружения.
+
+    Общие лимиты отправки бота и запросов к API делятся между shards
+    процессами. Шарды пишут в общую базу состояния, поэтому фиксируют
+    каждую запись сразу, не удерживая блокировку на пачку.
+    """
+    from telebot import TeleBot
+
+    bot = TeleBot(token=check_telegram_token())
+    max_in_flight = int(os.getenv('MAX_IN_FLIGHT', DEFAULT_MAX_IN_FLIGHT))
+    hedge_quantile = float(os.getenv('HEDGE_QUANTILE', DEFAULT_QUANTILE))
+    session = PooledSession(
+        pool_size=int(os.getenv('POOL_SIZE', max_in_flight)),
+        keep_alive=os.getenv('KEEP_ALIVE', '1') != '0'
+    )
+    store = StateStore(os.getenv('STATE_DB', DEFAULT_PATH),
+                       batch_size=DEFAULT_BATCH_SIZE if shards == 1 else 1)
+    halt = threading.Event()
+    limiter = TelegramRateLimiter(
+        global_rate=float(os.getenv('TELEGRAM_GLOBAL_RATE',
+                                    TELEGRAM_GLOBAL_RATE)) / shards,
+        chat_rate=float(os.getenv('TELEGRAM_CHAT_RATE', TELEGRAM_CHAT_RATE)),
+        sleep=halt.wait
+    )
+    return PollingEngine(
+        bot, tenants, max_in_flight=max_in_flight, session=session,
+        scheduler=PollScheduler(
+            cold_interval=float(os.getenv('COLD_INTERVAL',
+                                          DEFAULT_COLD_INTERVAL)),
+            cold_after=float(os.getenv('COLD_AFTER', DEFAULT_COLD_AFTER))
+        ),
+        store=store, limiter=limiter,
+        sender_workers=int(os.getenv('SENDER_WORKERS', DEFAULT_WORKERS)),
+        send_queue_size=int(os.getenv('SEND_QUEUE_SIZE', DEFAULT_QUEUE_SIZE)),
+        endpoint=os.getenv('PRACTICUM_ENDPOINT'),
+        cache=ResponseCache(int(os.getenv('RESPONSE_CACHE_SIZE',
+                                          DEFAULT_MAXSIZE))),
+        breaker=CircuitBreaker(
+            failure_threshold=int(os.getenv('BREAKER_FAILURES',
+                                            DEFAULT_FAILURE_THRESHOLD)),
+            recovery_timeout=float(os.getenv('BREAKER_RESET_TIMEOUT',
+                                             DEFAULT_RECOVERY_TIMEOUT))
+        ),
+        poll_deadline=float(os.getenv('POLL_DEADLINE',
+                                      DEFAULT_POLL_DEADLINE)),
+        hedger=Hedger(hedge_quantile) if hedge_quantile else None,
+        overlap=int(os.getenv('WATERMARK_OVERLAP', WATERMARK_OVERLAP)),
+        digest_window=float(os.getenv('DIGEST_WINDOW', DEFAULT_WINDOW)),
+        budget=RequestBudget(float(os.getenv('PRACTICUM_RATE',
+                                             PRACTICUM_RATE)) / shards),
+        retry=RetryPolicy(
+            attempts=int(os.getenv('SEND_ATTEMPTS', DEFAULT_ATTEMPTS)),
+            base_delay=float(os.getenv('SEND_RETRY_DELAY',
+                                       DEFAULT_BASE_DELAY)),
+            max_delay=float(os.getenv('SEND_RETRY_MAX_DELAY',
+                                      DEFAULT_MAX_DELAY)),
+            sleep=halt.wait
+        ),
+        halt=halt
+    )
+
+
+def run_engine():
+    """Запуск движка по настройкам из окружения."""
+    init()
+    check_telegram_token()
+    tenants = load_tenants()
+    check_tenants(tenants)
+    tenants = check_preflight(tenants)
+    engine = build_engine(tenants)
+    metrics_port = os.getenv('METRICS_PORT', str(DEFAULT_PORT))
+    if metrics_port != '0':
+        start_metrics_server(int(metrics_port))
+    logger.info('Запущен опрос для %s получателей, токенов: %s',
+                len(tenants), len(engine.subscriptions))
+    asyncio.run(serve(engine, float(os.getenv('SHUTDOWN_GRACE',
+                                              DEFAULT_GRACE_PERIOD))))
+    logger.info('Бот остановлен.')
+
+
+if __name__ == '__main__':
+    run_engine()
@@ -1,10 +1,44 @@
 class IncorrectResponseCodeError(Exception):
     """Cбой при запросе к эндпоинту. Некорректный ответ."""
 
-    pass
+    def __init__(self, message, status_code=None):
+        """Код ответа сохраняется для разбора ошибки."""
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class RateLimitedError(IncorrectResponseCodeError):
+    """API Практикума ответило 429: превышен лимит запросов."""
+
+    def __init__(self, message, status_code=None, retry_after=None):
+        """Пауза из Retry-After в секундах, если сервер её указал."""
+        super().__init__(message, status_code)
+        self.retry_after = retry_after
 
 
 class NotTokenError(Exception):
     """Cбой при запросе к эндпоинту. Некорректный ответ."""
 
     pass
+
+
+class CircuitOpenError(Exception):
+    """Запрос не отправлен: предохранитель API разомкнут."""
+
+    pass
+
+
+class DeadlineExceededError(Exception):
+    """Время, отведённое на опрос API, истекло."""
+
+    pass
+
+
+class ShutdownRequested(BaseException):
+    """Получен сигнал остановки.
+
+    Наследуется от BaseException, чтобы его не перехватывал общий
+    обработчик ошибок в цикле опроса.
+    """
+
+    pass
@@ -0,0 +1,78 @@
+import asyncio
+
+from metrics import registry, stage_seconds
+
+DEFAULT_QUANTILE = 0.95
+DEFAULT_MIN_SAMPLES = 50
+MIN_DELAY = 0.01
+
+hedge_total = registry.counter(
+    'homework_hedge_total', 'Дублирующие запросы к API по исходу'
+)
+
+
+def retrieve(future):
+    """Забираем исключение проигравшего запроса без предупреждений."""
+    if not future.cancelled():
+        future.exception()
+
+
+class Hedger:
+    """Дублирующий запрос, если первый отвечает дольше квантиля задержки.
+
+    Порог берётся из гистограммы успешных запросов к API; пока наблюдений
+    меньше min_samples, запросы не дублируются. Побеждает первый успешный
+    ответ, ответ второго запроса отбрасывается.
+    """
+
+    def __init__(self, quantile=DEFAULT_QUANTILE,
+                 min_samples=DEFAULT_MIN_SAMPLES, histogram=stage_seconds):
+        """По умолчанию дублируем запросы медленнее p95."""
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self.histogram = histogram
+        self.labels = {'stage': 'get_api_answer', 'outcome': 'ok'}
+
+    def delay(self):
+        """Через сколько секунд отправлять дублирующий запрос."""
+        if self.histogram.count(**self.labels) < self.min_samples:
+            return None
+        return max(self.histogram.quantile(self.quantile, **self.labels),
+                   MIN_DELAY)
+
+    async def run(self, start, hedge=None):
+        """Запрос start() с дублированием; start возвращает future.
+
+        Дубль запускает hedge() (по умолчанию start); если hedge вернул
+        None, дубль не отправляется и ждём первый запрос.
+        """
+        first = start()
+        first.add_done_callback(retrieve)
+        delay = self.delay()
+        if delay is None:
+            return await first
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done:
+            return first.result()
+        second = (start if hedge is None else hedge)()
+        if second is None:
+            hedge_total.inc(result='skipped')
+            return await first
+        hedge_total.inc(result='fired')
+        second.add_done_callback(retrieve)
+        pending = {first, second}
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for future in done:
+                if future.exception() is None:
+                    hedge_total.inc(
+                        result='hedge_won' if future is second
+                        else 'primary_won'
+                    )
+                    return future.result()
+                error = future.exception()
+        hedge_total.inc(result='failed')
+        raise error
@@ -1,18 +1,18 @@
+from contextlib import suppress
 import logging
-from logging.handlers import RotatingFileHandler
 from http import HTTPStatus
 import os
-import sys
 import time
 
-from dotenv import load_dotenv
-import requests
-from telebot import TeleBot
-
-from exceptions import (IncorrectResponseCodeError,
-                        NotTokenError)
-
-load_dotenv()
+from budget import parse_retry_after
+from changes import ChangeIndex, earliest_date, from_date, next_watermark
+from digest import split_digest
+from exceptions import (DeadlineExceededError, IncorrectResponseCodeError,
+                        NotTokenError, RateLimitedError, ShutdownRequested)
+from incidents import IncidentTracker
+from log_config import setup_logging
+from metrics import observe
+from shutdown import GracefulShutdown
 
 
 PRACTICUM_TOKEN = os.getenv('PRACTICUM_TOKEN')
@@ -20,6 +20,8 @@ TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
 TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
 
 RETRY_PERIOD = 600
+CONNECT_TIMEOUT = 3.05
+READ_TIMEOUT = 10
 ENDPOINT = 'https://practicum.yandex.ru/api/user_api/homework_statuses/'
 HEADERS = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
 
@@ -30,27 +32,24 @@ HOMEWORK_VERDICTS = {
     'rejected': 'Работа проверена: у ревьюера есть замечания.'
 }
 
-logging.basicConfig(
-    level=logging.DEBUG,
-    filename='program.log',
-    format='%(asctime)s, %(funcName)s, %(message)s, %(name)s'
-)
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
-formatter = logging.Formatter(
-    '%(asctime)s - %(funcName)s - %(levelname)s - %(message)s'
-)
-stream_handler = logging.StreamHandler(sys.stdout)
-stream_handler.setFormatter(formatter)
-logger.addHandler(stream_handler)
-file_handler = RotatingFileHandler(
-    'my_logger.log',
-    maxBytes=50000000,
-    backupCount=5,
-    encoding='utf-8'
-)
-file_handler.setFormatter(formatter)
-logger.addHandler(file_handler)
+
+
+def init(level=None, sinks=None):
+    """Настройка приложения: переменные из .env и логирование.
+
+    При импорте модуль ничего не настраивает и не загружает тяжёлые
+    библиотеки; это делается здесь, при запуске.
+    """
+    global PRACTICUM_TOKEN, TELEGRAM_TOKEN, TELEGRAM_CHAT_ID, HEADERS
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    PRACTICUM_TOKEN = os.getenv('PRACTICUM_TOKEN')
+    TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
+    TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
+    HEADERS = get_headers(PRACTICUM_TOKEN)
+    setup_logging(level, sinks)
 
 
 def check_tokens():
@@ -73,99 +72,202 @@ def check_tokens():
 
 def send_message(bot, message):
     """Отправка сообщений в телеграм."""
+    return send_to_chat(bot, TELEGRAM_CHAT_ID, message)
+
+
+def post_to_chat(bot, chat_id, message, limiter=None):
+    """Отправка сообщения в указанный чат телеграма без обработки ошибок.
+
+    Если передан ограничитель, отправка ждёт его разрешения, а retry_after
+    из ответа Telegram притормаживает следующие отправки в этот чат.
+    """
+    if limiter is not None:
+        limiter.acquire(chat_id)
+    try:
+        with observe('send_message'):
+            bot.send_message(chat_id, message)
+    except Exception as err:
+        if limiter is not None:
+            limiter.observe_error(chat_id, err)
+        raise
+    logger.debug('Сообщение "%s" отправлено пользователю с id: %s',
+                 message, chat_id)
+
+
+def send_to_chat(bot, chat_id, message, limiter=None):
+    """Отправка сообщения в указанный чат телеграма."""
     try:
-        bot.send_message(TELEGRAM_CHAT_ID, message)
+        post_to_chat(bot, chat_id, message, limiter)
     except Exception as err:
-        logger.error(f'Ошибка при отправке сообщения {err}')
+        logger.error('Ошибка при отправке сообщения %s', err)
         return False
-    else:
-        logger.debug(
-            f'Сообщение "{message}"'
-            f' отправлено пользователю с id: {TELEGRAM_CHAT_ID}'
-        )
-        return True
+    return True
+
+
+def get_headers(token):
+    """Заголовки авторизации для токена Практикума."""
+    return {'Authorization': f'OAuth {token}'}
 
 
 def get_api_answer(timestamp):
     """Проверка доступности эндпойнта."""
+    return request_statuses(timestamp, HEADERS)
+
+
+def request_timeout(deadline=None):
+    """Таймауты соединения и чтения с учётом крайнего срока опроса."""
+    if deadline is None:
+        return CONNECT_TIMEOUT, READ_TIMEOUT
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise DeadlineExceededError('Время на опрос API истекло до запроса.')
+    return min(CONNECT_TIMEOUT, remaining), min(READ_TIMEOUT, remaining)
+
+
+def request_statuses(timestamp, headers, session=None, endpoint=None,
+                     cache=None, deadline=None, budget=None):
+    """Запрос статусов домашних работ с заданными заголовками.
+
+    Если передана сессия, запрос идёт через её пул соединений; с кэшем
+    запрос становится условным, а неизменный ответ не разбирается заново.
+    Таймауты не выходят за крайний срок deadline по time.monotonic().
+    Код ответа и заголовки лимита запросов передаются в бюджет budget.
+    """
+    import requests
+
+    get = session.get if session is not None else requests.get
     payload = {'from_date': timestamp}
+    token = headers.get('Authorization')
+    entry = cache.get(token) if cache is not None else None
     params = {
-        'url': ENDPOINT,
-        'headers': HEADERS,
-        'params': payload
+        'url': endpoint or ENDPOINT,
+        'headers': headers,
+        'params': payload,
+        'timeout': request_timeout(deadline)
     }
-    logger.debug('Начат запрос к API на эндпоинт {url}'
-                 ' с параметрами {headers}'
-                 ' и временем {params}'.format(**params))
-    try:
-        homework_statuses = requests.get(**params)
-    except Exception as error:
-        message = ('Ошибка подключения {error} '
-                   'к эндпоинту {ENDPOINT}.'
-                   'с параметрами {headers}.'
-                   'и временем {params}.').format(error=error, **params)
-        raise ConnectionError(message)
-    if homework_statuses.status_code != HTTPStatus.OK:
-        message = (f'Эндпоинт недоступен.'
-                   f'Статус ответа {homework_statuses.status_code}.'
-                   f'Причина ответа {homework_statuses.reason}.'
-                   f'Текст ответа {homework_statuses.text}.')
-        raise IncorrectResponseCodeError(message)
-    return homework_statuses.json()
+    if entry is not None:
+        params['headers'] = dict(
+            headers, **cache.conditional_headers(entry)
+        )
+    logger.debug('Начат запрос к API на эндпоинт %s'
+                 ' с параметрами %s и временем %s',
+                 params['url'], headers, payload)
+    with observe('get_api_answer'):
+        try:
+            homework_statuses = get(**params)
+        except Exception as error:
+            message = ('Ошибка подключения {error} '
+                       'к эндпоинту {url}.'
+                       'с параметрами {headers}.'
+                       'и временем {params}.').format(error=error, **params)
+            raise ConnectionError(message)
+        response_headers = getattr(homework_statuses, 'headers', None) or {}
+        if budget is not None:
+            budget.observe(homework_statuses.status_code, response_headers)
+        if homework_statuses.status_code == HTTPStatus.TOO_MANY_REQUESTS:
+            raise RateLimitedError(
+                f'Превышен лимит запросов к API. '
+                f'Retry-After: {response_headers.get("Retry-After")}.',
+                homework_statuses.status_code,
+                parse_retry_after(response_headers.get('Retry-After'))
+            )
+        if (entry is not None
+                and homework_statuses.status_code == HTTPStatus.NOT_MODIFIED):
+            cache.hit('not_modified')
+            return entry.data
+        if homework_statuses.status_code != HTTPStatus.OK:
+            message = (f'Эндпоинт недоступен.'
+                       f'Статус ответа {homework_statuses.status_code}.'
+                       f'Причина ответа {homework_statuses.reason}.'
+                       f'Текст ответа {homework_statuses.text}.')
+            raise IncorrectResponseCodeError(message,
+                                             homework_statuses.status_code)
+        if cache is not None:
+            return cache.store(token, timestamp, homework_statuses)
+        return homework_statuses.json()
 
 
 def check_response(response):
     """Проверка наличия ключей в respons'е."""
-    if not isinstance(response, dict):
-        raise TypeError('Неверный формат данных, ожидаем словарь')
-    if not response.get('homeworks'):
-        raise KeyError('Нет ключа homeworks!')
-    homeworks = response.get('homeworks')
-    if not isinstance(homeworks, list):
-        raise TypeError('Неверный формат homeworks, ожидаем список')
-    return homeworks
+    with observe('check_response'):
+        if not isinstance(response, dict):
+            raise TypeError('Неверный формат данных, ожидаем словарь')
+        if 'homeworks' not in response:
+            raise KeyError('Нет ключа homeworks!')
+        homeworks = response.get('homeworks')
+        if not isinstance(homeworks, list):
+            raise TypeError('Неверный формат homeworks, ожидаем список')
+        return homeworks
 
 
 def parse_status(homework):
     """Проверка статуса."""
-    homework_name = homework.get('homework_name')
-    status = homework.get('status')
-    if not homework_name:
-        raise KeyError('Отсутствует ключ - "homework_name"')
-    elif not status:
-        raise KeyError('Отсутствует ключ - "status"')
-    elif status not in HOMEWORK_VERDICTS:
-        raise ValueError('Неопознанный ключ. '
-                         'Ключа "status" нет в "HOMEWORK_VERDICTS"')
-    verdict = HOMEWORK_VERDICTS.get(status)
-    return f'Изменился статус проверки работы "{homework_name}". {verdict}'
+    with observe('parse_status'):
+        homework_name = homework.get('homework_name')
+        status = homework.get('status')
+        if not homework_name:
+            raise KeyError('Отсутствует ключ - "homework_name"')
+        elif not status:
+            raise KeyError('Отсутствует ключ - "status"')
+        elif status not in HOMEWORK_VERDICTS:
+            raise ValueError('Неопознанный ключ. '
+                             'Ключа "status" нет в "HOMEWORK_VERDICTS"')
+        verdict = HOMEWORK_VERDICTS.get(status)
+        return (f'Изменился статус проверки работы "{homework_name}". '
+                f'{verdict}')
+
+
+def send_changes(bot, index, changes):
+    """Отправка изменившихся статусов сводными сообщениями.
+
+    Возвращает date_updated самой ранней недоставленной работы или None.
+    """
+    failed = set()
+    for text, numbers in split_digest(map(parse_status, changes)):
+        if not send_message(bot, text):
+            failed |= numbers
+    undelivered = []
+    for number, homework in enumerate(changes):
+        if number in failed:
+            undelivered.append(homework.get('date_updated'))
+        else:
+            index.commit(homework)
+    return earliest_date(undelivered)
 
 
 def main():
     """Основная логика работы бота."""
+    from telebot import TeleBot
+
     check_tokens()
     bot = TeleBot(token=TELEGRAM_TOKEN)
     timestamp = 0
-    last_message = ''
-    while True:
-        try:
-            response = get_api_answer(timestamp)
-            if not response:
-                logger.debug('Новых статусов нет.')
-                continue
-            homework = check_response(response)[0]
-            message = parse_status(homework)
-            if last_message != message and send_message(bot, message):
-                last_message = message
-                timestamp = response.get('current_date', timestamp)
-        except Exception as error:
-            message = f'Сбой в работе программы: {error}'
-            logger.error(message)
-            if message != last_message and send_message(bot, message):
-                last_message = message
-        finally:
-            time.sleep(RETRY_PERIOD)
+    incidents = IncidentTracker()
+    index = ChangeIndex()
+    shutdown = GracefulShutdown()
+    with shutdown.installed(), suppress(ShutdownRequested):
+        while not shutdown.requested.is_set():
+            with shutdown.working():
+                try:
+                    response = get_api_answer(from_date(timestamp))
+                    changes = index.diff(check_response(response))
+                    message = incidents.recovered()
+                    if message:
+                        send_message(bot, message)
+                    if not changes:
+                        logger.debug('Новых статусов нет.')
+                    since = send_changes(bot, index, changes)
+                    timestamp = next_watermark(response, timestamp, since)
+                except Exception as error:
+                    logger.error('Сбой в работе программы: %s', error)
+                    message = incidents.failure(error, ENDPOINT)
+                    if message and not send_message(bot, message):
+                        incidents.undelivered()
+            if not shutdown.requested.is_set():
+                time.sleep(RETRY_PERIOD)
+    logger.info('Бот остановлен.')
 
 
 if __name__ == '__main__':
+    init()
     main()
@@ -0,0 +1,87 @@
+import logging
+import time
+
+from metrics import registry
+
+logger = logging.getLogger(__name__)
+incidents_total = registry.counter(
+    'homework_incidents_total', 'Инциденты и уведомления о них по событию'
+)
+
+
+def fingerprint(error, endpoint=None):
+    """Отпечаток сбоя: тип исключения и адрес API без текста ошибки."""
+    return type(error).__name__, endpoint
+
+
+def format_duration(seconds):
+    """Длительность в виде «1 ч 2 мин 3 с»."""
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    parts = [f'{value} {unit}' for value, unit
+             in ((hours, 'ч'), (minutes, 'мин')) if value]
+    if seconds or not parts:
+        parts.append(f'{seconds} с')
+    return ' '.join(parts)
+
+
+class Incident:
+    """Серия одинаковых сбоев подряд."""
+
+    def __init__(self, key, error, started):
+        """Инцидент начинается с первого сбоя."""
+        self.key = key
+        self.error = error
+        self.started = started
+        self.count = 1
+        self.notified = False
+
+
+class IncidentTracker:
+    """Сводит повторяющиеся сбои в одно уведомление на инцидент.
+
+    О новом сбое получатель узнаёт один раз; повторы того же типа только
+    считаются. После первого успешного опроса отправляется одно сообщение
+    о восстановлении с числом сбоев и длительностью инцидента.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        """Инцидента нет."""
+        self.clock = clock
+        self.incident = None
+
+    def failure(self, error, endpoint=None):
+        """Учёт сбоя; текст уведомления или None, если оно уже было."""
+        key = fingerprint(error, endpoint)
+        incident = self.incident
+        if incident is not None and incident.key == key:
+            incident.count += 1
+            incident.error = error
+        else:
+            incident = self.incident = Incident(key, error, self.clock())
+            incidents_total.inc(event='opened')
+        if incident.notified:
+            return None
+        incident.notified = True
+        incidents_total.inc(event='notified')
+        return f'Сбой в работе программы: {error}'
+
+    def undelivered(self):
+        """Уведомление о сбое не доставлено, повторим при следующем сбое."""
+        if self.incident is not None:
+            self.incident.notified = False
+
+    def recovered(self):
+        """Конец инцидента; текст уведомления или None."""
+        incident, self.incident = self.incident, None
+        if incident is None:
+            return None
+        duration = format_duration(self.clock() - incident.started)
+        logger.info('Работа восстановлена: %s сбоев за %s',
+                    incident.count, duration)
+        incidents_total.inc(event='recovered')
+        if not incident.notified:
+            return None
+        return (f'Работа восстановлена. Сбоев подряд: {incident.count} '
+                f'за {duration}, последний: {incident.error}')
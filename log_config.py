@@ -0,0 +1,180 @@
+import atexit
+import logging
+from logging.handlers import QueueHandler, RotatingFileHandler
+import os
+import queue
+import sys
+import threading
+
+LOG_FORMAT = '%(asctime)s - %(funcName)s - %(levelname)s - %(message)s'
+DEFAULT_LEVEL = 'DEBUG'
+DEFAULT_SINKS = 'stdout,my_logger.log'
+DEFAULT_MAX_BYTES = 50000000
+DEFAULT_BACKUP_COUNT = 5
+DEFAULT_BATCH_SIZE = 256
+
+STOP = None
+
+
+class BatchFlushMixin:
+    """Обработчик сбрасывает буфер не после каждой записи, а после пачки."""
+
+    def flush(self):
+        """Сброс откладывается до конца пачки."""
+
+    def flush_batch(self):
+        """Сброс буфера после пачки записей."""
+        try:
+            super().flush()
+        except (OSError, ValueError):
+            pass
+
+
+class BatchStreamHandler(BatchFlushMixin, logging.StreamHandler):
+    """Вывод в поток со сбросом пачками."""
+
+
+class BatchRotatingFileHandler(BatchFlushMixin, RotatingFileHandler):
+    """Ротируемый файл со сбросом пачками."""
+
+
+class DeferredQueueHandler(QueueHandler):
+    """Кладёт запись в очередь без форматирования.
+
+    Сообщение собирается из шаблона и аргументов уже в потоке записи.
+    """
+
+    def prepare(self, record):
+        """Запись передаётся как есть."""
+        return record
+
+
+def create_sink(sink, max_bytes=DEFAULT_MAX_BYTES,
+                backup_count=DEFAULT_BACKUP_COUNT):
+    """Обработчик для приёмника: stdout, stderr или путь к файлу."""
+    if sink == 'stdout':
+        handler = BatchStreamHandler(sys.stdout)
+    elif sink == 'stderr':
+        handler = BatchStreamHandler(sys.stderr)
+    else:
+        handler = BatchRotatingFileHandler(sink, maxBytes=max_bytes,
+                                           backupCount=backup_count,
+                                           encoding='utf-8')
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    return handler
+
+
+def parse_sinks(sinks):
+    """Список приёмников из строки через запятую."""
+    if isinstance(sinks, str):
+        sinks = sinks.split(',')
+    return [sink.strip() for sink in sinks if sink.strip()]
+
+
+class LogListener(threading.Thread):
+    """Поток, который пишет записи лога во все приёмники пачками."""
+
+    def __init__(self, handlers, batch_size=DEFAULT_BATCH_SIZE):
+        """Очередь без ограничения, чтобы запись в лог не блокировала."""
+        super().__init__(name='log-listener', daemon=True)
+        self.queue = queue.SimpleQueue()
+        self.handlers = list(handlers)
+        self.batch_size = batch_size
+        self.lock = threading.Lock()
+
+    def collect(self):
+        """Ждём первую запись и забираем всё, что уже накопилось."""
+        batch = [self.queue.get()]
+        while batch[-1] is not STOP and len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def write(self, batch):
+        """Запись пачки и один сброс буферов."""
+        with self.lock:
+            handlers = self.handlers
+            for record in batch:
+                if record is STOP:
+                    continue
+                for handler in handlers:
+                    if record.levelno >= handler.level:
+                        handler.handle(record)
+            for handler in handlers:
+                handler.flush_batch()
+
+    def run(self):
+        """Разбор очереди до сигнала остановки."""
+        while True:
+            batch = self.collect()
+            self.write(batch)
+            if batch[-1] is STOP:
+                return
+
+    def replace_handlers(self, handlers):
+        """Подмена приёмников на лету."""
+        with self.lock:
+            old, self.handlers = self.handlers, list(handlers)
+        for handler in old:
+            handler.flush_batch()
+            handler.close()
+
+    def stop(self):
+        """Запись оставшегося и закрытие приёмников."""
+        if self.is_alive():
+            self.queue.put(STOP)
+            self.join()
+        self.replace_handlers([])
+
+
+listener = None
+queue_handler = None
+
+
+def setup_logging(level=None, sinks=None):
+    """Настройка логирования через очередь и отдельный поток.
+
+    Уровень и приёмники берутся из LOG_LEVEL и LOG_SINKS, если не переданы.
+    """
+    global listener, queue_handler
+    if listener is not None:
+        set_level(level or os.getenv('LOG_LEVEL', DEFAULT_LEVEL))
+        set_sinks(sinks or os.getenv('LOG_SINKS', DEFAULT_SINKS))
+        return listener
+    listener = LogListener(
+        [create_sink(sink) for sink
+         in parse_sinks(sinks or os.getenv('LOG_SINKS', DEFAULT_SINKS))]
+    )
+    queue_handler = DeferredQueueHandler(listener.queue)
+    root = logging.getLogger()
+    root.addHandler(queue_handler)
+    set_level(level or os.getenv('LOG_LEVEL', DEFAULT_LEVEL))
+    listener.start()
+    atexit.register(stop_logging)
+    return listener
+
+
+def set_level(level):
+    """Смена уровня логирования на лету."""
+    logging.getLogger().setLevel(
+        level.upper() if isinstance(level, str) else level
+    )
+
+
+def set_sinks(sinks):
+    """Смена приёмников логов на лету."""
+    listener.replace_handlers(
+        [create_sink(sink) for sink in parse_sinks(sinks)]
+    )
+
+
+def stop_logging():
+    """Остановка потока записи с сохранением всех записей."""
+    global listener, queue_handler
+    if listener is None:
+        return
+    logging.getLogger().removeHandler(queue_handler)
+    listener.stop()
+    listener = queue_handler = None
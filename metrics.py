@@ -0,0 +1,280 @@
+import bisect
+from contextlib import contextmanager
+import threading
+import time
+
+from exceptions import DeadlineExceededError, IncorrectResponseCodeError
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+DEFAULT_PORT = 8000
+
+
+def classify(error):
+    """Исход этапа по исключению."""
+    if error is None:
+        return 'ok'
+    if isinstance(error, IncorrectResponseCodeError):
+        return 'non_200'
+    if isinstance(error, ConnectionError):
+        return 'connection_error'
+    if isinstance(error, DeadlineExceededError):
+        return 'deadline'
+    if isinstance(error, (KeyError, TypeError, ValueError)):
+        return 'parse_error'
+    return 'error'
+
+
+def format_labels(labels):
+    """Метки в формате Prometheus."""
+    if not labels:
+        return ''
+    return '{' + ','.join(
+        '{}="{}"'.format(name, str(value).replace('"', '\\"'))
+        for name, value in labels
+    ) + '}'
+
+
+class Counter:
+    """Счётчик с метками."""
+
+    kind = 'counter'
+
+    def __init__(self, name, help_text):
+        """Значения хранятся по кортежу меток."""
+        self.name = name
+        self.help = help_text
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        """Увеличить счётчик."""
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def snapshot(self):
+        """Копия значений для передачи в другой процесс."""
+        with self.lock:
+            return dict(self.values)
+
+    def merge(self, values):
+        """Прибавить значения из снимка."""
+        with self.lock:
+            for key, value in values.items():
+                self.values[key] = self.values.get(key, 0) + value
+
+    def samples(self):
+        """Строки значений для экспорта."""
+        with self.lock:
+            values = dict(self.values)
+        return [f'{self.name}{format_labels(key)} {value}'
+                for key, value in sorted(values.items())]
+
+
+class Histogram:
+    """Гистограмма с фиксированными границами корзин."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        """Для каждого набора меток — счётчики корзин, сумма и число."""
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        """Учесть одно наблюдение."""
+        key = tuple(sorted(labels.items()))
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.values.get(key)
+            if series is None:
+                series = self.values[key] = [
+                    [0] * (len(self.buckets) + 1), 0.0, 0
+                ]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, **labels):
+        """Число наблюдений в серии."""
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            series = self.values.get(key)
+            return series[2] if series is not None else 0
+
+    def quantile(self, q, **labels):
+        """Оценка квантиля с интерполяцией внутри корзины.
+
+        Без меток считается по всем сериям гистограммы.
+        """
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            if labels:
+                series = [self.values[key]] if key in self.values else []
+            else:
+                series = list(self.values.values())
+            counts = [sum(column)
+                      for column in zip(*(item[0] for item in series))]
+        total = sum(counts)
+        if not total:
+            return None
+        rank = q * total
+        lower, seen = 0.0, 0
+        for bound, count in zip(self.buckets, counts):
+            if count and seen + count >= rank:
+                return lower + (bound - lower) * (rank - seen) / count
+            lower, seen = bound, seen + count
+        return self.buckets[-1]
+
+    def snapshot(self):
+        """Копия серий для передачи в другой процесс."""
+        with self.lock:
+            return {key: [list(counts), total, count]
+                    for key, (counts, total, count) in self.values.items()}
+
+    def merge(self, values):
+        """Прибавить серии из снимка с теми же корзинами."""
+        with self.lock:
+            for key, (counts, total, count) in values.items():
+                series = self.values.get(key)
+                if series is None:
+                    series = self.values[key] = [
+                        [0] * (len(self.buckets) + 1), 0.0, 0
+                    ]
+                series[0] = [old + new for old, new in zip(series[0], counts)]
+                series[1] += total
+                series[2] += count
+
+    def samples(self):
+        """Строки корзин, суммы и числа наблюдений."""
+        with self.lock:
+            values = {key: (list(counts), total, count)
+                      for key, (counts, total, count) in self.values.items()}
+        lines = []
+        for key, (counts, total, count) in sorted(values.items()):
+            cumulative = 0
+            for bound, bucket in zip(self.buckets + ('+Inf',), counts):
+                cumulative += bucket
+                labels = format_labels(key + (('le', bound),))
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            lines.append(f'{self.name}_sum{format_labels(key)} {total}')
+            lines.append(f'{self.name}_count{format_labels(key)} {count}')
+        return lines
+
+
+class Registry:
+    """Набор метрик процесса."""
+
+    def __init__(self):
+        """Метрики хранятся по имени."""
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def register(self, metric):
+        """Добавить метрику; повторная регистрация вернёт существующую."""
+        with self.lock:
+            return self.metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, help_text):
+        """Счётчик по имени."""
+        return self.register(Counter(name, help_text))
+
+    def histogram(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        """Гистограмма по имени."""
+        return self.register(Histogram(name, help_text, buckets))
+
+    def snapshot(self):
+        """Снимок всех метрик: имя -> (тип, описание, корзины, значения)."""
+        with self.lock:
+            metrics = list(self.metrics.values())
+        return {metric.name: (metric.kind, metric.help,
+                              getattr(metric, 'buckets', None),
+                              metric.snapshot())
+                for metric in metrics}
+
+    def merge(self, snapshot):
+        """Сложить снимок другого реестра с этим."""
+        for name, (kind, help_text, buckets, values) in snapshot.items():
+            if kind == Histogram.kind:
+                metric = self.histogram(name, help_text, buckets)
+            else:
+                metric = self.counter(name, help_text)
+            metric.merge(values)
+
+    def render(self):
+        """Все метрики в текстовом формате Prometheus."""
+        with self.lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+stage_seconds = registry.histogram(
+    'homework_stage_seconds', 'Длительность этапов опроса и отправки'
+)
+stage_total = registry.counter(
+    'homework_stage_total', 'Число выполнений этапов по исходу'
+)
+
+
+@contextmanager
+def observe(stage):
+    """Замер длительности этапа и учёт его исхода."""
+    start = time.perf_counter()
+    error = None
+    try:
+        yield
+    except BaseException as exc:
+        error = exc
+        raise
+    finally:
+        outcome = classify(error)
+        stage_seconds.observe(time.perf_counter() - start,
+                              stage=stage, outcome=outcome)
+        stage_total.inc(stage=stage, outcome=outcome)
+
+
+class MetricsHandler:
+    """Отдаёт метрики по адресу /metrics.
+
+    Примешивается к BaseHTTPRequestHandler при запуске сервера, чтобы
+    http.server не загружался при импорте.
+    """
+
+    registry = registry
+
+    def do_GET(self):
+        """Ответ в текстовом формате Prometheus."""
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = self.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """Запросы к метрикам не логируем."""
+
+
+def start_metrics_server(port=DEFAULT_PORT, host='127.0.0.1',
+                         metrics_registry=registry):
+    """Запуск HTTP-сервера метрик в фоновом потоке."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    handler = type('Handler', (MetricsHandler, BaseHTTPRequestHandler),
+                   {'registry': metrics_registry})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, name='metrics',
+                     daemon=True).start()
+    return server
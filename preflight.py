@@ -0,0 +1,135 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from http import HTTPStatus
+import logging
+import time
+
+from exceptions import IncorrectResponseCodeError
+from homework import get_headers, request_statuses
+from metrics import registry
+from retry import CHAT_GONE, PERMANENT, classify
+
+DEFAULT_CONCURRENCY = 20
+PREFLIGHT_DEADLINE = 15
+
+VALID = 'valid'
+INVALID = 'invalid'
+UNKNOWN = 'unknown'
+
+DEAD_TOKEN_CODES = (HTTPStatus.UNAUTHORIZED, HTTPStatus.FORBIDDEN)
+
+logger = logging.getLogger(__name__)
+preflight_total = registry.counter(
+    'homework_preflight_total', 'Проверки получателей при запуске по исходу'
+)
+
+
+def check_token(token, session=None, endpoint=None, budget=None):
+    """Проверка токена Практикума одним запросом за текущий момент.
+
+    INVALID — только если API отклонило токен; сбой сети или API
+    означает, что токен проверить не удалось.
+    """
+    if budget is not None:
+        time.sleep(budget.reserve())
+    try:
+        request_statuses(int(time.time()), get_headers(token), session,
+                         endpoint, deadline=time.monotonic()
+                         + PREFLIGHT_DEADLINE, budget=budget)
+    except IncorrectResponseCodeError as error:
+        if error.status_code in DEAD_TOKEN_CODES:
+            return INVALID, f'API отклонило токен: {error.status_code}'
+        return UNKNOWN, str(error)
+    except Exception as error:
+        return UNKNOWN, str(error)
+    return VALID, None
+
+
+def check_chat(bot, chat_id):
+    """Проверка, что бот может писать в чат, через getChat."""
+    try:
+        bot.get_chat(chat_id)
+    except Exception as error:
+        if (getattr(error, 'error_code', None) is not None
+                and classify(error) in (CHAT_GONE, PERMANENT)):
+            return INVALID, f'чат недоступен: {error}'
+        return UNKNOWN, str(error)
+    return VALID, None
+
+
+class PreflightReport:
+    """Итог проверки получателей при запуске."""
+
+    def __init__(self, tenants, tokens, chats):
+        """Результаты проверок по токенам и чатам."""
+        self.tokens = tokens
+        self.chats = chats
+        self.valid = []
+        self.quarantined = {}
+        for tenant in tenants:
+            reasons = [reason for status, reason in (tokens[tenant.token],
+                                                     chats[tenant.chat_id])
+                       if status == INVALID]
+            if reasons:
+                self.quarantined[tenant] = '; '.join(reasons)
+            else:
+                self.valid.append(tenant)
+
+    def count(self, results, status):
+        """Число проверок с исходом status."""
+        return sum(1 for result, _ in results.values() if result == status)
+
+    def summary(self):
+        """Сводка для лога."""
+        return (
+            f'Проверка получателей: годны {len(self.valid)}, '
+            f'на карантине {len(self.quarantined)}. '
+            f'Токены: отклонено {self.count(self.tokens, INVALID)}, '
+            f'не проверено {self.count(self.tokens, UNKNOWN)} '
+            f'из {len(self.tokens)}. '
+            f'Чаты: недоступно {self.count(self.chats, INVALID)}, '
+            f'не проверено {self.count(self.chats, UNKNOWN)} '
+            f'из {len(self.chats)}.'
+        )
+
+    def log(self):
+        """Запись сводки и причин карантина в лог."""
+        for tenant, reason in self.quarantined.items():
+            logger.error('Получатель %s (чат %s) на карантине: %s',
+                         tenant.key, tenant.chat_id, reason)
+        logger.info(self.summary())
+
+
+async def run_checks(checks, concurrency):
+    """Параллельный запуск блокирующих проверок, не больше concurrency."""
+    loop = asyncio.get_running_loop()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = await asyncio.gather(
+            *(loop.run_in_executor(executor, check) for check in checks)
+        )
+    return results
+
+
+async def preflight(tenants, bot, concurrency=DEFAULT_CONCURRENCY,
+                    session=None, endpoint=None, budget=None):
+    """Проверка всех токенов и чатов получателей перед запуском опроса.
+
+    Каждый токен и каждый чат проверяются один раз, даже если встречаются
+    у нескольких получателей.
+    """
+    tokens = list(dict.fromkeys(tenant.token for tenant in tenants))
+    chats = list(dict.fromkeys(tenant.chat_id for tenant in tenants))
+    results = await run_checks(
+        [partial(check_token, token, session, endpoint, budget)
+         for token in tokens]
+        + [partial(check_chat, bot, chat_id) for chat_id in chats],
+        concurrency
+    )
+    for number, (status, _) in enumerate(results):
+        preflight_total.inc(kind='token' if number < len(tokens) else 'chat',
+                            result=status)
+    report = PreflightReport(tenants, dict(zip(tokens, results)),
+                             dict(zip(chats, results[len(tokens):])))
+    report.log()
+    return report
@@ -0,0 +1,163 @@
+import threading
+import time
+
+from exceptions import ShutdownRequested
+
+TELEGRAM_GLOBAL_RATE = 30
+TELEGRAM_CHAT_RATE = 1
+TELEGRAM_CHAT_BURST = 1
+IDLE_BUCKETS_LIMIT = 10000
+
+
+def get_retry_after(error):
+    """Значение retry_after из ответа Telegram с кодом 429."""
+    result = getattr(error, 'result_json', None) or {}
+    parameters = result.get('parameters') or {}
+    retry_after = parameters.get('retry_after')
+    if retry_after is None and getattr(error, 'error_code', None) == 429:
+        return 1
+    return retry_after
+
+
+class TokenBucket:
+    """Ведро токенов: rate токенов в секунду, не больше capacity."""
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic):
+        """Ведро создаётся полным."""
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.clock = clock
+        self.tokens = self.capacity
+        self.updated = clock()
+        self.blocked_until = 0
+        self.lock = threading.Lock()
+
+    def refill(self, now):
+        """Пополнение ведра за прошедшее время."""
+        self.tokens = min(self.capacity,
+                          self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self):
+        """Забронировать токен; вернуть, сколько секунд ждать."""
+        with self.lock:
+            now = self.clock()
+            self.refill(now)
+            self.tokens -= 1
+            wait = 0 if self.tokens >= 0 else -self.tokens / self.rate
+            return max(wait, self.blocked_until - now)
+
+    def take(self):
+        """Взять токен, только если он есть сейчас и ведро не заблокировано."""
+        with self.lock:
+            now = self.clock()
+            self.refill(now)
+            if self.tokens < 1 or self.blocked_until > now:
+                return False
+            self.tokens -= 1
+            return True
+
+    def block(self, seconds):
+        """Не выдавать токены ближайшие seconds секунд."""
+        with self.lock:
+            now = self.clock()
+            self.blocked_until = max(self.blocked_until, now + seconds)
+            self.refill(now)
+            self.tokens = min(self.tokens, 0)
+
+    def is_idle(self):
+        """Ведро полное и его можно забыть."""
+        with self.lock:
+            self.refill(self.clock())
+            return (self.tokens >= self.capacity
+                    and self.blocked_until <= self.updated)
+
+
+class TelegramRateLimiter:
+    """Ограничение отправки: общий лимит бота и лимит на каждый чат.
+
+    Перед отправкой поток ждёт токены обоих вёдер. Ответ 429 с retry_after
+    блокирует ведро чата на указанное время. Если sleep(seconds) вернул
+    True (прерванный threading.Event.wait), ожидание прекращается
+    исключением ShutdownRequested.
+    """
+
+    def __init__(self, global_rate=TELEGRAM_GLOBAL_RATE,
+                 chat_rate=TELEGRAM_CHAT_RATE, chat_burst=TELEGRAM_CHAT_BURST,
+                 sleep=time.sleep, clock=time.monotonic):
+        """Лимиты задаются в сообщениях в секунду."""
+        self.global_bucket = TokenBucket(global_rate, clock=clock)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.chat_buckets = {}
+        self.sleep = sleep
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.waiting = 0
+        self.acquired = 0
+        self.throttled = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def chat_bucket(self, chat_id):
+        """Ведро чата, создаётся при первой отправке."""
+        with self.lock:
+            bucket = self.chat_buckets.get(chat_id)
+            if bucket is None:
+                if len(self.chat_buckets) >= IDLE_BUCKETS_LIMIT:
+                    self.forget_idle()
+                bucket = TokenBucket(self.chat_rate, self.chat_burst,
+                                     clock=self.clock)
+                self.chat_buckets[chat_id] = bucket
+            return bucket
+
+    def forget_idle(self):
+        """Удаление полных вёдер чатов, чтобы словарь не рос."""
+        for chat_id in [chat_id for chat_id, bucket
+                        in self.chat_buckets.items() if bucket.is_idle()]:
+            del self.chat_buckets[chat_id]
+
+    def pause(self, seconds):
+        """Ожидание с учётом числа ждущих отправок."""
+        if seconds <= 0:
+            return 0
+        with self.lock:
+            self.waiting += 1
+        try:
+            if self.sleep(seconds):
+                raise ShutdownRequested
+        finally:
+            with self.lock:
+                self.waiting -= 1
+        return seconds
+
+    def acquire(self, chat_id):
+        """Дождаться права на отправку сообщения в чат."""
+        wait = self.pause(self.chat_bucket(chat_id).reserve())
+        wait += self.pause(self.global_bucket.reserve())
+        with self.lock:
+            self.acquired += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            if wait > 0:
+                self.throttled += 1
+        return wait
+
+    def observe_error(self, chat_id, error):
+        """Учесть retry_after из ошибки Telegram."""
+        retry_after = get_retry_after(error)
+        if retry_after:
+            self.chat_bucket(chat_id).block(float(retry_after))
+        return retry_after
+
+    def stats(self):
+        """Очередь ожидающих отправок и время ожидания."""
+        with self.lock:
+            return {
+                'waiting': self.waiting,
+                'acquired': self.acquired,
+                'throttled': self.throttled,
+                'avg_wait': (self.total_wait / self.acquired
+                             if self.acquired else 0.0),
+                'max_wait': self.max_wait,
+            }
@@ -0,0 +1,168 @@
+from collections import OrderedDict
+import hashlib
+import logging
+import random
+import threading
+import time
+
+from changes import homework_version
+from metrics import registry
+from ratelimit import get_retry_after
+
+DEFAULT_ATTEMPTS = 5
+DEFAULT_BASE_DELAY = 1
+DEFAULT_MAX_DELAY = 60
+DEFAULT_DEDUP_TTL = 600
+DEDUP_LIMIT = 100000
+
+TRANSIENT = 'transient'
+AMBIGUOUS = 'ambiguous'
+PERMANENT = 'permanent'
+CHAT_GONE = 'chat_gone'
+FINAL = (PERMANENT, CHAT_GONE)
+
+CHAT_GONE_DESCRIPTIONS = (
+    'chat not found', 'bot was blocked', 'bot was kicked',
+    'user is deactivated', 'chat_id is empty', 'peer_id_invalid',
+)
+
+logger = logging.getLogger(__name__)
+delivery_total = registry.counter(
+    'homework_delivery_total', 'Попытки отправки в Telegram по исходу'
+)
+
+
+def classify(error):
+    """Вид ошибки отправки в Telegram.
+
+    TRANSIENT — стоит повторить; AMBIGUOUS — запрос ушёл, но ответа нет,
+    и сообщение могло быть доставлено; CHAT_GONE — чат недоступен боту
+    навсегда; PERMANENT — повтор не поможет.
+    """
+    from requests.exceptions import ReadTimeout
+
+    if isinstance(error, ReadTimeout):
+        return AMBIGUOUS
+    if isinstance(error, OSError):
+        return TRANSIENT
+    code = getattr(error, 'error_code', None)
+    if code is None:
+        return PERMANENT
+    if code == 429 or code >= 500:
+        return TRANSIENT
+    description = str(getattr(error, 'description', '')).lower()
+    if code == 403 or any(text in description
+                          for text in CHAT_GONE_DESCRIPTIONS):
+        return CHAT_GONE
+    return PERMANENT
+
+
+class Undelivered:
+    """Неудачная отправка: ложна в условиях и хранит вид ошибки."""
+
+    __slots__ = ('kind',)
+
+    def __init__(self, kind):
+        """Вид последней ошибки хранится в kind."""
+        self.kind = kind
+
+    def __bool__(self):
+        """Сообщение не доставлено."""
+        return False
+
+    def __repr__(self):
+        """Вид ошибки для логов."""
+        return f'Undelivered({self.kind!r})'
+
+
+def dedup_key(tenant_key, homework):
+    """Ключ уведомления: получатель и версия работы."""
+    return hashlib.sha256(
+        f'{tenant_key}:{homework_version(homework)}'.encode()
+    ).hexdigest()
+
+
+class DeliveryLog:
+    """Ключи уведомлений, которые могли дойти после таймаута без ответа.
+
+    Такое уведомление не повторяется: его ключ ttl секунд не даёт
+    отправить то же уведомление снова.
+    """
+
+    def __init__(self, ttl=DEFAULT_DEDUP_TTL, limit=DEDUP_LIMIT,
+                 clock=time.monotonic):
+        """Журнал хранит не больше limit ключей."""
+        self.ttl = ttl
+        self.limit = limit
+        self.clock = clock
+        self.keys = OrderedDict()
+        self.lock = threading.Lock()
+
+    def __contains__(self, key):
+        """Отправлялось ли сообщение недавно."""
+        with self.lock:
+            self.expire()
+            return key in self.keys
+
+    def add(self, key):
+        """Запомнить уведомление, которое могло дойти."""
+        with self.lock:
+            self.keys[key] = self.clock()
+            self.keys.move_to_end(key)
+            self.expire()
+
+    def expire(self):
+        """Удаление устаревших ключей."""
+        deadline = self.clock() - self.ttl
+        while self.keys and (len(self.keys) > self.limit
+                             or next(iter(self.keys.values())) < deadline):
+            self.keys.popitem(last=False)
+
+
+class RetryPolicy:
+    """Повтор временных ошибок с экспоненциальной паузой и джиттером.
+
+    Пауза перед попыткой n выбирается случайно от 0 до
+    min(max_delay, base_delay * 2 ** n); retry_after из ответа Telegram
+    с кодом 429 её не сокращает. Таймаут без ответа не повторяется:
+    сообщение могло дойти. sleep(delay) может вернуть
+    True — так прерывается пауза при остановке (threading.Event.wait),
+    и повторы прекращаются.
+    """
+
+    def __init__(self, attempts=DEFAULT_ATTEMPTS,
+                 base_delay=DEFAULT_BASE_DELAY, max_delay=DEFAULT_MAX_DELAY,
+                 sleep=time.sleep, rand=random.random):
+        """Не больше attempts попыток на сообщение."""
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.sleep = sleep
+        self.rand = rand
+
+    def delay(self, attempt, error=None):
+        """Пауза перед повтором номер attempt (с нуля)."""
+        delay = self.rand() * min(self.max_delay,
+                                  self.base_delay * 2 ** attempt)
+        return max(delay, float(get_retry_after(error) or 0))
+
+    def call(self, send):
+        """Вызов send() с повторами; вернёт вид последней ошибки или None."""
+        for attempt in range(self.attempts):
+            try:
+                send()
+            except Exception as error:
+                kind = classify(error)
+                delivery_total.inc(result=kind)
+                if kind != TRANSIENT or attempt + 1 == self.attempts:
+                    logger.error('Ошибка при отправке сообщения %s', error)
+                    return kind
+                delay = self.delay(attempt, error)
+                logger.warning('Повтор отправки через %.1f с: %s',
+                               delay, error)
+                if self.sleep(delay):
+                    logger.error('Повтор отменён остановкой: %s', error)
+                    return kind
+            else:
+                delivery_total.inc(result='sent')
+                return None
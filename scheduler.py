@@ -0,0 +1,169 @@
+import heapq
+import itertools
+import random
+import time
+
+from homework import RETRY_PERIOD
+from metrics import registry
+
+DEFAULT_JITTER = 0.1
+DEFAULT_INTERVALS = {
+    'reviewing': RETRY_PERIOD // 2,
+    'rejected': RETRY_PERIOD,
+    'approved': RETRY_PERIOD * 6,
+}
+DEFAULT_COLD_INTERVAL = RETRY_PERIOD * 36
+DEFAULT_COLD_AFTER = 14 * 24 * 60 * 60
+
+HOT = 'hot'
+WARM = 'warm'
+COLD = 'cold'
+TIERS = (HOT, WARM, COLD)
+
+REMOVED = object()
+
+scheduled_total = registry.counter(
+    'homework_scheduled_total', 'Запланированные опросы по уровню активности'
+)
+
+
+class PollScheduler:
+    """Очередь опросов с приоритетом по времени следующей проверки.
+
+    Интервал зависит от статуса последней работы получателя: во время
+    ревью опрашиваем чаще, после принятия работы — реже или перестаём
+    совсем (интервал None). Каждая перестановка стоит O(log n): старые
+    записи в куче не удаляются, а помечаются и отбрасываются при извлечении.
+
+    Получатели делятся на уровни: hot — работа на ревью или недавно
+    возвращена, cold — все работы приняты или заброшены и изменений не было
+    cold_after секунд, остальные — warm. Холодные опрашиваются раз
+    в cold_interval; как только появляется новая работа, статус меняется,
+    и получатель сразу поднимается в hot.
+
+    demand — сколько запросов в секунду требует расписание; если он выше
+    бюджета API, все интервалы растягиваются в slowdown раз.
+    """
+
+    def __init__(self, intervals=None, default_interval=RETRY_PERIOD,
+                 jitter=DEFAULT_JITTER, clock=time.monotonic,
+                 cold_interval=DEFAULT_COLD_INTERVAL,
+                 cold_after=DEFAULT_COLD_AFTER, wall_clock=time.time):
+        """Интервалы задаются словарём статус -> секунды."""
+        self.intervals = dict(DEFAULT_INTERVALS)
+        if intervals:
+            self.intervals.update(intervals)
+        self.default_interval = default_interval
+        self.cold_interval = cold_interval
+        self.cold_after = cold_after
+        self.jitter = jitter
+        self.clock = clock
+        self.wall_clock = wall_clock
+        self.heap = []
+        self.entries = {}
+        self.tiers = {}
+        self.rates = {}
+        self.demand = 0.0
+        self.slowdown = 1
+        self.counter = itertools.count()
+
+    def __len__(self):
+        """Число запланированных получателей."""
+        return len(self.entries)
+
+    def __contains__(self, key):
+        """Запланирован ли получатель."""
+        return key in self.entries
+
+    def tier_for(self, status, last_updated=None):
+        """Уровень активности по статусу и времени последнего изменения."""
+        quiet = (last_updated is not None
+                 and self.wall_clock() - last_updated >= self.cold_after)
+        if status == 'reviewing' or (status == 'rejected' and not quiet):
+            return HOT
+        if status in ('rejected', 'approved') and quiet:
+            return COLD
+        return WARM
+
+    def interval_for(self, status, tier=None):
+        """Интервал опроса со случайным разбросом или None."""
+        interval = self.intervals.get(status, self.default_interval)
+        if interval is None:
+            return None
+        if tier == COLD:
+            interval = max(interval, self.cold_interval)
+        return (interval * self.slowdown
+                * random.uniform(1 - self.jitter, 1 + self.jitter))
+
+    def schedule(self, key, delay):
+        """Запланировать опрос через delay секунд."""
+        self.remove(key)
+        entry = [self.clock() + delay, next(self.counter), key]
+        self.entries[key] = entry
+        heapq.heappush(self.heap, entry)
+
+    def spread(self, keys, period=None):
+        """Равномерно разбросать первые опросы по периоду."""
+        period = self.default_interval if period is None else period
+        for key in keys:
+            self.schedule(key, random.uniform(0, period))
+
+    def reschedule(self, key, status=None, last_updated=None):
+        """Следующий опрос по статусу; терминальный статус снимает опрос."""
+        tier = self.tier_for(status, last_updated)
+        interval = self.interval_for(status, tier)
+        if interval is None:
+            self.remove(key)
+            return None
+        self.schedule(key, interval)
+        self.tiers[key] = tier
+        self.rates[key] = self.slowdown / interval
+        self.demand += self.rates[key]
+        scheduled_total.inc(tier=tier)
+        return interval
+
+    def tier_counts(self):
+        """Число запланированных получателей на каждом уровне."""
+        counts = dict.fromkeys(TIERS, 0)
+        for key in self.entries:
+            tier = self.tiers.get(key)
+            if tier is not None:
+                counts[tier] += 1
+        return counts
+
+    def remove(self, key):
+        """Снять получателя с расписания."""
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            entry[-1] = REMOVED
+        self.tiers.pop(key, None)
+        self.demand -= self.rates.pop(key, 0)
+        if len(self.heap) > 2 * len(self.entries) + 64:
+            self.compact()
+
+    def compact(self):
+        """Выбросить из кучи помеченные записи."""
+        self.heap = [entry for entry in self.heap if entry[-1] is not REMOVED]
+        heapq.heapify(self.heap)
+
+    def pop_due(self, now=None, limit=None):
+        """Извлечь получателей, чьё время опроса наступило."""
+        now = self.clock() if now is None else now
+        due = []
+        while self.heap and self.heap[0][0] <= now:
+            if limit is not None and len(due) >= limit:
+                break
+            _, _, key = heapq.heappop(self.heap)
+            if key is REMOVED:
+                continue
+            del self.entries[key]
+            due.append(key)
+        return due
+
+    def next_delay(self, max_delay):
+        """Сколько секунд ждать до ближайшего опроса."""
+        while self.heap and self.heap[0][-1] is REMOVED:
+            heapq.heappop(self.heap)
+        if not self.heap:
+            return max_delay
+        return min(max(self.heap[0][0] - self.clock(), 0), max_delay)
@@ -0,0 +1,92 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import threading
+
+DEFAULT_WORKERS = 8
+DEFAULT_QUEUE_SIZE = 1000
+DEFAULT_DRAIN_TIMEOUT = 30
+
+logger = logging.getLogger(__name__)
+
+
+class SenderPool:
+    """Ограниченная очередь исходящих сообщений и пул отправителей.
+
+    Опрос кладёт сообщения в очередь и не ждёт Telegram; если очередь
+    заполнена, submit() ждёт свободного места. Результат отправки
+    (True/False) передаётся в callback. При остановке очередь
+    дорабатывается до конца или до истечения таймаута; после таймаута
+    выставляется событие halt, которое прерывает паузы отправителей,
+    и пул не ждёт их потоки.
+    """
+
+    def __init__(self, send, workers=DEFAULT_WORKERS,
+                 maxsize=DEFAULT_QUEUE_SIZE, halt=None):
+        """send(chat_id, text) — блокирующая отправка, вернёт True/False."""
+        self.send = send
+        self.halt = threading.Event() if halt is None else halt
+        self.workers = workers
+        self.maxsize = maxsize
+        self.queue = None
+        self.tasks = []
+        self.executor = None
+
+    def __len__(self):
+        """Число сообщений в очереди."""
+        return self.queue.qsize() if self.queue is not None else 0
+
+    @property
+    def running(self):
+        """Запущены ли отправители."""
+        return bool(self.tasks)
+
+    def start(self):
+        """Запуск отправителей в текущем цикле событий."""
+        self.queue = asyncio.Queue(self.maxsize)
+        self.executor = ThreadPoolExecutor(max_workers=self.workers)
+        self.tasks = [asyncio.create_task(self.worker())
+                      for _ in range(self.workers)]
+
+    async def submit(self, chat_id, text, callback=None, key=None):
+        """Поставить сообщение в очередь; key передаётся в send."""
+        await self.queue.put((chat_id, text, callback, key))
+
+    async def deliver(self, chat_id, text, key=None):
+        """Одна отправка в пуле потоков."""
+        loop = asyncio.get_running_loop()
+        args = (chat_id, text) if key is None else (chat_id, text, key)
+        try:
+            return await loop.run_in_executor(self.executor, self.send,
+                                              *args)
+        except Exception as error:
+            logger.error('Ошибка при отправке сообщения %s', error)
+            return False
+
+    async def worker(self):
+        """Отправитель: разбирает очередь до остановки."""
+        while True:
+            chat_id, text, callback, key = await self.queue.get()
+            try:
+                delivered = await self.deliver(chat_id, text, key)
+                if callback is not None:
+                    callback(delivered)
+            except Exception as error:
+                logger.error('Ошибка обработки результата отправки %s', error)
+            finally:
+                self.queue.task_done()
+
+    async def shutdown(self, timeout=DEFAULT_DRAIN_TIMEOUT):
+        """Дождаться отправки очереди и остановить отправителей."""
+        if not self.running:
+            return
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.error('Не доставлено при остановке: %s', len(self))
+            self.halt.set()
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+        self.executor.shutdown(wait=False, cancel_futures=True)
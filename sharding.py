@@ -0,0 +1,251 @@
+import asyncio
+import bisect
+import hashlib
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+
+from engine import (build_engine, check_preflight, check_telegram_token,
+                    check_tenants, load_tenants, serve)
+from homework import init
+from metrics import DEFAULT_PORT, Registry, registry, start_metrics_server
+from shutdown import DEFAULT_GRACE_PERIOD, GracefulShutdown
+
+DEFAULT_REPLICAS = 100
+SNAPSHOT_PERIOD = 5
+RESTART_DELAY = 1
+MAX_RESTART_DELAY = 60
+SUPERVISE_TICK = 1
+STOP_MARGIN = 1
+SHARD_LOG_SINKS = 'stdout'
+
+logger = logging.getLogger(__name__)
+restarts_total = registry.counter(
+    'homework_shard_restarts_total', 'Перезапуски упавших процессов-шардов'
+)
+
+
+def ring_hash(key):
+    """Точка на кольце для ключа."""
+    return int.from_bytes(
+        hashlib.blake2b(str(key).encode(), digest_size=8).digest(), 'big'
+    )
+
+
+class HashRing:
+    """Кольцо согласованного хэширования с виртуальными узлами.
+
+    При добавлении или удалении узла переезжает только доля ключей
+    этого узла, а не все ключи.
+    """
+
+    def __init__(self, nodes, replicas=DEFAULT_REPLICAS):
+        """Каждый узел занимает replicas точек на кольце."""
+        self.replicas = replicas
+        self.points = []
+        self.nodes = {}
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node):
+        """Добавить узел."""
+        for replica in range(self.replicas):
+            point = ring_hash(f'{node}#{replica}')
+            if point not in self.nodes:
+                bisect.insort(self.points, point)
+            self.nodes[point] = node
+
+    def remove(self, node):
+        """Убрать узел."""
+        self.points = [point for point in self.points
+                       if self.nodes[point] != node]
+        self.nodes = {point: self.nodes[point] for point in self.points}
+
+    def node_for(self, key):
+        """Узел, которому принадлежит ключ."""
+        index = bisect.bisect(self.points, ring_hash(key))
+        return self.nodes[self.points[index % len(self.points)]]
+
+
+def assign(tenants, shards, replicas=DEFAULT_REPLICAS):
+    """Получатели по шардам; чаты одного токена попадают в один шард."""
+    ring = HashRing(range(shards), replicas)
+    groups = [[] for _ in range(shards)]
+    for tenant in tenants:
+        groups[ring.node_for(tenant.token)].append(tenant)
+    return groups
+
+
+def export_metrics(number, snapshots, period):
+    """Периодическая отправка снимка метрик шарда супервизору."""
+    while True:
+        time.sleep(period)
+        snapshots.put((number, os.getpid(), registry.snapshot()))
+
+
+def run_shard(number, tenants, shards, snapshots, period=SNAPSHOT_PERIOD):
+    """Точка входа процесса-шарда.
+
+    Логи по умолчанию пишутся в stdout: файл с ротацией нельзя делить
+    между процессами.
+    """
+    init(sinks=os.getenv('LOG_SINKS', SHARD_LOG_SINKS))
+    polling = build_engine(tenants, shards)
+    threading.Thread(target=export_metrics, args=(number, snapshots, period),
+                     name='metrics-export', daemon=True).start()
+    logger.info('Шард %s: опрос для %s получателей', number, len(tenants))
+    asyncio.run(serve(polling, float(os.getenv('SHUTDOWN_GRACE',
+                                               DEFAULT_GRACE_PERIOD))))
+
+
+class Supervisor:
+    """Запускает шарды, перезапускает упавшие и собирает их метрики.
+
+    Шард, завершившийся с ошибкой, перезапускается с паузой, которая
+    удваивается при частых падениях. Последний снимок метрик упавшего
+    шарда сохраняется, чтобы суммарные счётчики не уменьшались.
+    """
+
+    def __init__(self, tenants, shards, target=run_shard,
+                 restart_delay=RESTART_DELAY, context=None,
+                 clock=time.monotonic, grace_period=DEFAULT_GRACE_PERIOD):
+        """Процессы создаются через spawn, чтобы не копировать потоки."""
+        self.context = context or multiprocessing.get_context('spawn')
+        self.groups = assign(tenants, shards)
+        self.shards = shards
+        self.target = target
+        self.restart_delay = restart_delay
+        self.grace_period = grace_period
+        self.clock = clock
+        self.snapshots = self.context.Queue()
+        self.processes = {}
+        self.started = {}
+        self.delays = {}
+        self.restart_at = {}
+        self.latest = {}
+        self.retired = Registry()
+        self.lock = threading.Lock()
+
+    def start_shard(self, number):
+        """Запуск процесса шарда."""
+        process = self.context.Process(
+            target=self.target, name=f'shard-{number}', daemon=True,
+            args=(number, self.groups[number], self.shards, self.snapshots)
+        )
+        process.start()
+        self.processes[number] = process
+        self.started[number] = self.clock()
+
+    def start(self):
+        """Запуск всех шардов."""
+        for number, group in enumerate(self.groups):
+            logger.info('Шард %s: %s получателей', number, len(group))
+            self.start_shard(number)
+
+    def collect(self, timeout=0):
+        """Приём снимков метрик от шардов."""
+        items = []
+        try:
+            items.append(self.snapshots.get(timeout=timeout))
+            while True:
+                items.append(self.snapshots.get_nowait())
+        except queue.Empty:
+            pass
+        with self.lock:
+            for number, pid, snapshot in items:
+                process = self.processes.get(number)
+                if process is not None and process.pid == pid:
+                    self.latest[number] = snapshot
+
+    def retire(self, number):
+        """Сохранить последний снимок метрик завершившегося шарда."""
+        with self.lock:
+            if number in self.latest:
+                self.retired.merge(self.latest.pop(number))
+
+    def check(self):
+        """Перезапуск упавших шардов; завершившийся с кодом 0 не трогаем."""
+        now = self.clock()
+        for number, process in list(self.processes.items()):
+            if process.is_alive():
+                continue
+            if process.exitcode == 0:
+                logger.info('Шард %s завершил работу', number)
+                self.retire(number)
+                del self.processes[number]
+                continue
+            if number not in self.restart_at:
+                logger.error('Шард %s завершился с кодом %s',
+                             number, process.exitcode)
+                self.retire(number)
+                delay = self.delays.get(number, self.restart_delay)
+                if now - self.started[number] > MAX_RESTART_DELAY:
+                    delay = self.restart_delay
+                self.restart_at[number] = now + delay
+                self.delays[number] = min(delay * 2, MAX_RESTART_DELAY)
+            elif now >= self.restart_at[number]:
+                del self.restart_at[number]
+                restarts_total.inc(shard=number)
+                logger.warning('Перезапуск шарда %s', number)
+                self.start_shard(number)
+
+    def render(self):
+        """Сумма метрик супервизора и всех шардов."""
+        merged = Registry()
+        merged.merge(registry.snapshot())
+        with self.lock:
+            merged.merge(self.retired.snapshot())
+            for snapshot in self.latest.values():
+                merged.merge(snapshot)
+        return merged.render()
+
+    def stop(self, timeout=None):
+        """Мягкая остановка шардов, по истечении timeout — принудительная."""
+        timeout = self.grace_period if timeout is None else timeout
+        deadline = self.clock() + timeout
+        for process in self.processes.values():
+            process.terminate()
+        for process in self.processes.values():
+            process.join(max(deadline - self.clock(), 0))
+        for number, process in self.processes.items():
+            if process.is_alive():
+                logger.error('Шард %s не остановился за %s с', number,
+                             timeout)
+                process.kill()
+                process.join()
+
+    def run(self, metrics_port=DEFAULT_PORT):
+        """Наблюдение за шардами до SIGTERM или SIGINT."""
+        shutdown = GracefulShutdown()
+        self.start()
+        if metrics_port:
+            start_metrics_server(metrics_port, metrics_registry=self)
+        with shutdown.installed(), shutdown.working():
+            try:
+                while not shutdown.requested.is_set():
+                    self.collect(SUPERVISE_TICK)
+                    self.check()
+            finally:
+                self.stop()
+
+
+def run_sharded():
+    """Запуск шардированного режима по настройкам из окружения."""
+    init()
+    check_telegram_token()
+    tenants = load_tenants()
+    check_tenants(tenants)
+    tenants = check_preflight(tenants)
+    shards = int(os.getenv('SHARDS', os.cpu_count() or 1))
+    logger.info('Запущено %s шардов для %s получателей', shards, len(tenants))
+    grace_period = float(os.getenv('SHUTDOWN_GRACE', DEFAULT_GRACE_PERIOD))
+    Supervisor(tenants, shards, grace_period=grace_period + STOP_MARGIN).run(
+        int(os.getenv('METRICS_PORT', str(DEFAULT_PORT)))
+    )
+
+
+if __name__ == '__main__':
+    run_sharded()
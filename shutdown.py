@@ -0,0 +1,61 @@
+from contextlib import contextmanager
+import logging
+import signal
+import threading
+
+from exceptions import ShutdownRequested
+
+DEFAULT_GRACE_PERIOD = 30
+SIGNALS = (signal.SIGTERM, signal.SIGINT)
+
+logger = logging.getLogger(__name__)
+
+
+def in_main_thread():
+    """Обработчики сигналов ставятся только из главного потока."""
+    return threading.current_thread() is threading.main_thread()
+
+
+class GracefulShutdown:
+    """Остановка по SIGTERM и SIGINT без потери работы.
+
+    Пока идёт работа (working), сигнал только запоминается, и цикл
+    завершается после неё. Во время ожидания сигнал прерывает его
+    исключением ShutdownRequested.
+    """
+
+    def __init__(self):
+        """Сигнала ещё не было."""
+        self.requested = threading.Event()
+        self.busy = False
+
+    def handle(self, signum, frame=None):
+        """Обработчик сигнала."""
+        logger.warning('Получен сигнал %s, завершаем работу',
+                       signal.Signals(signum).name)
+        self.requested.set()
+        if not self.busy:
+            raise ShutdownRequested(signum)
+
+    @contextmanager
+    def working(self):
+        """Участок, который сигнал не прерывает."""
+        self.busy = True
+        try:
+            yield
+        finally:
+            self.busy = False
+
+    @contextmanager
+    def installed(self, signals=SIGNALS):
+        """Обработчики сигналов на время блока."""
+        if not in_main_thread():
+            yield self
+            return
+        previous = {signum: signal.signal(signum, self.handle)
+                    for signum in signals}
+        try:
+            yield self
+        finally:
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
@@ -0,0 +1,159 @@
+import sqlite3
+import threading
+import time
+
+DEFAULT_PATH = 'state.sqlite3'
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_COMMIT_INTERVAL = 1.0
+DEFAULT_BUSY_TIMEOUT = 30
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS watermarks ('
+    ' tenant TEXT PRIMARY KEY,'
+    ' watermark INTEGER NOT NULL)',
+    'CREATE TABLE IF NOT EXISTS statuses ('
+    ' tenant TEXT NOT NULL,'
+    ' homework TEXT NOT NULL,'
+    ' status TEXT NOT NULL,'
+    ' date_updated TEXT,'
+    ' PRIMARY KEY (tenant, homework))',
+    'CREATE TABLE IF NOT EXISTS outbox ('
+    ' id INTEGER PRIMARY KEY AUTOINCREMENT,'
+    ' tenant TEXT NOT NULL,'
+    ' chat_id TEXT NOT NULL,'
+    ' homework TEXT,'
+    ' status TEXT,'
+    ' date_updated TEXT,'
+    ' message TEXT NOT NULL)',
+)
+
+
+class StateStore:
+    """Состояние получателей в SQLite: отметка времени и статусы работ.
+
+    База работает в режиме WAL, записи копятся и фиксируются пачкой —
+    по числу изменений или по времени. Состояние получателя читается
+    только при первом обращении, поэтому запуск не зависит от числа
+    получателей. Уведомления о статусах записываются в outbox до отправки
+    и удаляются после неё, чтобы после падения отправить их снова.
+
+    Если базу делят несколько процессов, пачка держит блокировку записи
+    до фиксации, поэтому им нужен batch_size=1; занятая база ждётся
+    до busy_timeout секунд.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, batch_size=DEFAULT_BATCH_SIZE,
+                 commit_interval=DEFAULT_COMMIT_INTERVAL,
+                 busy_timeout=DEFAULT_BUSY_TIMEOUT):
+        """Открытие базы и создание таблиц."""
+        self.connection = sqlite3.connect(path, timeout=busy_timeout,
+                                          check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        for statement in SCHEMA:
+            self.connection.execute(statement)
+        self.connection.commit()
+        self.batch_size = batch_size
+        self.commit_interval = commit_interval
+        self.pending = 0
+        self.last_commit = time.monotonic()
+        self.lock = threading.RLock()
+
+    def get_watermark(self, tenant):
+        """Последняя сохранённая current_date получателя."""
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT watermark FROM watermarks WHERE tenant = ?',
+                (tenant,)
+            ).fetchone()
+        return row[0] if row else 0
+
+    def set_watermark(self, tenant, current_date):
+        """Сохранение current_date получателя."""
+        self.write(
+            'INSERT INTO watermarks (tenant, watermark) VALUES (?, ?) '
+            'ON CONFLICT (tenant) DO UPDATE SET '
+            'watermark = excluded.watermark',
+            (tenant, current_date)
+        )
+
+    def get_statuses(self, tenant):
+        """Доставленные версии работ: ключ -> (status, date_updated)."""
+        with self.lock:
+            rows = self.connection.execute(
+                'SELECT homework, status, date_updated FROM statuses '
+                'WHERE tenant = ?',
+                (tenant,)
+            ).fetchall()
+        return {homework: (status, date_updated)
+                for homework, status, date_updated in rows}
+
+    def set_status(self, tenant, homework, status, date_updated=None):
+        """Сохранение доставленной версии работы."""
+        self.write(
+            'INSERT INTO statuses (tenant, homework, status, date_updated) '
+            'VALUES (?, ?, ?, ?) '
+            'ON CONFLICT (tenant, homework) DO UPDATE SET '
+            'status = excluded.status, date_updated = excluded.date_updated',
+            (tenant, homework, status, date_updated)
+        )
+
+    def add_outbox(self, tenant, chat_id, message, homework=None,
+                   status=None, date_updated=None):
+        """Запись уведомления в outbox до отправки; вернёт id записи."""
+        return self.write(
+            'INSERT INTO outbox (tenant, chat_id, homework, status, '
+            'date_updated, message) VALUES (?, ?, ?, ?, ?, ?)',
+            (tenant, chat_id, homework, status, date_updated, message)
+        ).lastrowid
+
+    def delete_outbox(self, outbox_id):
+        """Уведомление доставлено, запись больше не нужна."""
+        self.write('DELETE FROM outbox WHERE id = ?', (outbox_id,))
+
+    def get_outbox(self):
+        """Неподтверждённые уведомления в порядке записи."""
+        with self.lock:
+            return self.connection.execute(
+                'SELECT id, tenant, chat_id, homework, status, date_updated, '
+                'message FROM outbox ORDER BY id'
+            ).fetchall()
+
+    def write(self, statement, params):
+        """Запись с фиксацией пачкой."""
+        with self.lock:
+            cursor = self.connection.execute(statement, params)
+            self.pending += 1
+            if self.pending >= self.batch_size:
+                self.flush()
+            return cursor
+
+    def maybe_flush(self):
+        """Фиксация, если с прошлой прошло больше commit_interval."""
+        with self.lock:
+            if (self.pending and time.monotonic() - self.last_commit
+                    >= self.commit_interval):
+                self.flush()
+
+    def sync(self):
+        """Фиксация накопленного перед внешним действием.
+
+        Отправители вызывают её перед отправкой, поэтому записи outbox
+        фиксируются одной транзакцией на пачку сообщений.
+        """
+        with self.lock:
+            if self.pending:
+                self.flush()
+
+    def flush(self):
+        """Фиксация накопленных изменений."""
+        with self.lock:
+            self.connection.commit()
+            self.pending = 0
+            self.last_commit = time.monotonic()
+
+    def close(self):
+        """Фиксация и закрытие базы."""
+        with self.lock:
+            self.flush()
+            self.connection.close()
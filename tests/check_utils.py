@@ -116,6 +116,22 @@ class MockTelegramBot:
         self.text = text
 
 
+class MockBot:
+    def __init__(self, *args, **kwargs):
+        self.sent = []
+
+    def send_message(self, chat_id, text):
+        self.sent.append((chat_id, text))
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
 class BreakInfiniteLoop(Exception):
     pass
 
@@ -0,0 +1,44 @@
+import pytest
+
+from bench import importtime, run
+import log_config
+
+
+@pytest.mark.timeout(10)
+def test_benchmark_reports_throughput(monkeypatch):
+    monkeypatch.setenv('LOG_LEVEL', 'WARNING')
+    monkeypatch.setenv('LOG_SINKS', 'stderr')
+    args = run.parse_args([
+        '--tenants', '5', '--duration', '0.6', '--interval', '0.2',
+        '--change-rate', '1', '--telegram-rate', '1000',
+        '--min-polls-per-sec', '1000000'
+    ])
+    try:
+        report = run.run(args)
+    finally:
+        log_config.stop_logging()
+    assert report['polls'] >= 5
+    assert report['notifications'] > 0
+    assert report['p50'] is not None
+    assert report['max_rss_mb'] > 0
+    assert run.check(report, args), 'Порог должен быть нарушен.'
+
+
+def test_parse_importtime():
+    output = (
+        'import time: self [us] | cumulative | imported package\n'
+        'import time:       120 |        120 |   changes\n'
+        'import time:      2500 |      23316 | homework\n'
+    )
+    assert importtime.parse_importtime(output) == {
+        'changes': 120, 'homework': 23316
+    }
+
+
+def test_homework_import_is_light():
+    args = importtime.parse_args(['--repeat', '1', '--budget-ms', '1000'])
+    report = importtime.run(args)
+    assert report['heavy_modules'] == [], (
+        'Импорт homework не должен загружать тяжёлые библиотеки.'
+    )
+    assert not importtime.check(report, args)
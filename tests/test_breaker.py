@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+import requests
+
+import engine
+from breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from exceptions import CircuitOpenError, IncorrectResponseCodeError
+import tests.check_utils as check_utils
+
+
+def fail():
+    raise ConnectionError('API недоступен')
+
+
+def test_breaker_opens_after_threshold():
+    breaker = CircuitBreaker(failure_threshold=3,
+                             clock=check_utils.FakeClock())
+    for _ in range(3):
+        with pytest.raises(ConnectionError):
+            breaker.call(fail)
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: 'ok')
+
+
+def test_breaker_ignores_client_errors():
+    breaker = CircuitBreaker(failure_threshold=1,
+                             clock=check_utils.FakeClock())
+
+    def unauthorized():
+        raise IncorrectResponseCodeError('401', 401)
+
+    with pytest.raises(IncorrectResponseCodeError):
+        breaker.call(unauthorized)
+    assert breaker.state == CLOSED
+
+
+def test_breaker_lets_single_probe_when_half_open():
+    clock = check_utils.FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=10,
+                             clock=clock)
+    with pytest.raises(ConnectionError):
+        breaker.call(fail)
+    clock.now = 10
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow(), 'Пробный запрос должен быть один.'
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    clock.now = 20
+    assert breaker.call(lambda: 'ok') == 'ok'
+    assert breaker.state == CLOSED
+
+
+def test_engine_skips_polls_while_open(monkeypatch):
+    calls = []
+
+    def get(*args, **kwargs):
+        calls.append(kwargs)
+        return check_utils.MockResponseGET(http_status=500)
+
+    monkeypatch.setattr(requests, 'get', get)
+    tenants = [engine.Tenant(f'token{i}', f'chat{i}') for i in range(5)]
+    bot = check_utils.MockBot()
+    polling = engine.PollingEngine(
+        bot, tenants, max_in_flight=1,
+        breaker=CircuitBreaker(failure_threshold=2,
+                               clock=check_utils.FakeClock())
+    )
+
+    asyncio.run(polling.poll_once())
+
+    assert len(calls) == 2
+    assert len(bot.sent) == 2, (
+        'Пропущенные опросы не шлют сообщений об ошибке.'
+    )
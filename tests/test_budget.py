@@ -0,0 +1,126 @@
+import asyncio
+from http import HTTPStatus
+
+import pytest
+import requests
+
+from budget import (MAX_PAUSE, MAX_SLOWDOWN, RequestBudget, parse_reset,
+                    parse_retry_after)
+import engine
+from exceptions import RateLimitedError
+from homework import get_headers, request_statuses
+from scheduler import PollScheduler
+import tests.check_utils as check_utils
+
+
+class Response:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.reason = ''
+        self.text = ''
+        self.headers = headers or {}
+
+    def json(self):
+        return {'homeworks': [], 'current_date': 1}
+
+
+class Session:
+    def __init__(self, response):
+        self.response = response
+
+    def get(self, url, headers, params, timeout=None):
+        return self.response
+
+
+def test_retry_after_accepts_seconds_and_http_date():
+    assert parse_retry_after('120') == 120
+    assert parse_retry_after('Thu, 01 Jan 1970 00:01:40 GMT', now=40) == 60
+    assert parse_retry_after('скоро') is None
+    assert parse_retry_after(None) is None
+
+
+def test_budget_spaces_requests_by_rate():
+    clock = check_utils.FakeClock()
+    budget = RequestBudget(rate=2, clock=clock)
+    assert [budget.reserve() for _ in range(3)] == [0, 0, 0.5]
+    clock.now = 10
+    stats = budget.stats()
+    assert stats['used'] == pytest.approx(0.3)
+    assert stats['utilization'] == pytest.approx(0.15)
+    assert stats['delayed'] == 1
+
+
+def test_too_many_requests_pauses_budget():
+    clock = check_utils.FakeClock()
+    budget = RequestBudget(rate=10, clock=clock)
+    session = Session(Response(HTTPStatus.TOO_MANY_REQUESTS,
+                               {'Retry-After': '30'}))
+    with pytest.raises(RateLimitedError) as error:
+        request_statuses(0, get_headers('token'), session, budget=budget)
+    assert error.value.retry_after == 30
+    assert budget.blocked_for() == 30
+    assert budget.reserve() == 30
+    assert budget.stats()['limited'] == 1
+
+
+def test_exhausted_remaining_pauses_until_reset():
+    clock = check_utils.FakeClock()
+    budget = RequestBudget(rate=10, clock=clock)
+    budget.observe(HTTPStatus.OK, {'X-RateLimit-Limit': '100',
+                                   'X-RateLimit-Remaining': '0',
+                                   'X-RateLimit-Reset': '15'})
+    assert budget.blocked_for() == 15
+    assert budget.stats()['server_utilization'] == 1
+
+
+def test_reset_accepts_seconds_and_epoch_time():
+    assert parse_reset(15, now=1792210000) == 15
+    assert parse_reset(1792210760, now=1792210000) == 760
+    assert parse_reset(1792210000 + 10 ** 6, now=1792210000) == MAX_PAUSE
+    budget = RequestBudget(rate=10, clock=check_utils.FakeClock())
+    budget.observe(HTTPStatus.OK, {'X-RateLimit-Remaining': '0',
+                                   'X-RateLimit-Reset': '1792210760'})
+    assert budget.blocked_for() <= MAX_PAUSE
+
+
+def test_scheduler_stretches_intervals_over_budget():
+    budget = RequestBudget(rate=1)
+    scheduler = PollScheduler(default_interval=10, jitter=0)
+    for key in range(40):
+        scheduler.reschedule(key)
+    assert scheduler.demand == pytest.approx(4)
+    scheduler.slowdown = budget.slowdown(scheduler.demand)
+    assert scheduler.slowdown == pytest.approx(4)
+    assert scheduler.interval_for(None) == pytest.approx(40)
+    scheduler.reschedule(0)
+    assert scheduler.demand == pytest.approx(4), (
+        'Спрос считается по интервалам без растяжения.'
+    )
+    assert budget.slowdown(10 ** 6) == MAX_SLOWDOWN
+
+
+def test_engine_does_not_report_rate_limit_as_failure(monkeypatch):
+    monkeypatch.setattr(requests, 'get', lambda *args, **kwargs: (
+        check_utils.MockResponseGET(http_status=HTTPStatus.TOO_MANY_REQUESTS)
+    ))
+    bot = check_utils.MockBot()
+    budget = RequestBudget(rate=100)
+    polling = engine.PollingEngine(bot, [engine.Tenant('token', 'chat')],
+                                   budget=budget)
+
+    asyncio.run(polling.poll_once())
+
+    assert not bot.sent, 'О 429 получателю не сообщаем.'
+    assert budget.blocked_for() > 0
+
+
+def test_try_reserve_never_waits():
+    clock = check_utils.FakeClock()
+    budget = RequestBudget(rate=1, clock=clock)
+    assert budget.try_reserve()
+    assert not budget.try_reserve()
+    clock.now = 1
+    budget.pause(10)
+    assert not budget.try_reserve()
+    clock.now = 12
+    assert budget.try_reserve()
@@ -0,0 +1,79 @@
+import json
+from http import HTTPStatus
+
+from cache import ResponseCache
+from homework import get_headers, request_statuses
+
+
+class Response:
+    def __init__(self, status_code, data=None, etag=None):
+        self.status_code = status_code
+        self.reason = ''
+        self.text = ''
+        self.content = json.dumps(data).encode() if data else b''
+        self.headers = {'ETag': etag} if etag else {}
+        self.decoded = 0
+
+    def json(self):
+        self.decoded += 1
+        return json.loads(self.content)
+
+
+class Session:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.sent_headers = []
+
+    def get(self, url, headers, params, timeout=None):
+        self.sent_headers.append(headers)
+        return self.responses.pop(0)
+
+
+DATA = {'homeworks': [], 'current_date': 1}
+
+
+def test_not_modified_returns_cached_data():
+    cache = ResponseCache()
+    session = Session([Response(HTTPStatus.OK, DATA, etag='"v1"'),
+                       Response(HTTPStatus.NOT_MODIFIED)])
+    headers = get_headers('token')
+    first = request_statuses(0, headers, session, cache=cache)
+    second = request_statuses(0, headers, session, cache=cache)
+    assert second is first
+    assert 'If-None-Match' not in session.sent_headers[0]
+    assert session.sent_headers[1]['If-None-Match'] == '"v1"'
+    assert cache.stats()['ratio'] == 0.5
+
+
+def test_same_body_is_not_decoded_again():
+    cache = ResponseCache()
+    repeated = Response(HTTPStatus.OK, DATA)
+    session = Session([Response(HTTPStatus.OK, DATA), repeated])
+    request_statuses(0, get_headers('token'), session, cache=cache)
+    request_statuses(5, get_headers('token'), session, cache=cache)
+    assert repeated.decoded == 0
+    assert cache.stats()['hits'] == 1
+
+
+def test_cache_evicts_least_recently_used():
+    cache = ResponseCache(maxsize=2)
+    session = Session([Response(HTTPStatus.OK, DATA) for _ in range(3)])
+    for token in ('a', 'b', 'c'):
+        request_statuses(0, get_headers(token), session, cache=cache)
+    assert cache.get(get_headers('a')['Authorization']) is None
+    assert cache.stats()['size'] == 2
+
+
+def test_changing_current_date_still_hits():
+    cache = ResponseCache()
+    repeated = Response(HTTPStatus.OK, {'homeworks': [], 'current_date': 7},
+                        etag='"v2"')
+    session = Session([Response(HTTPStatus.OK, DATA, etag='"v1"'), repeated])
+    request_statuses(0, get_headers('token'), session, cache=cache)
+    second = request_statuses(1, get_headers('token'), session, cache=cache)
+    assert session.sent_headers[1]['If-None-Match'] == '"v1"', (
+        'Валидаторы отправляются и после сдвига from_date.'
+    )
+    assert repeated.decoded == 0
+    assert second['current_date'] == 7
+    assert cache.stats()['hits'] == 1
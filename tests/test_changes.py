@@ -0,0 +1,60 @@
+from changes import ChangeIndex, from_date, next_watermark, parse_date
+
+
+def homework(id, status, date_updated='2024-01-01T10:00:00Z'):
+    return {'id': id, 'homework_name': f'hw{id}.zip', 'status': status,
+            'date_updated': date_updated}
+
+
+def test_diff_returns_only_changed_homeworks():
+    index = ChangeIndex()
+    first = [homework(1, 'reviewing'), homework(2, 'reviewing')]
+    assert index.diff(first) == first
+    for item in first:
+        index.commit(item)
+
+    second = [homework(1, 'reviewing'), homework(2, 'approved'),
+              homework(3, 'reviewing')]
+    assert index.diff(second) == second[1:]
+
+
+def test_new_review_with_same_status_is_a_change():
+    index = ChangeIndex()
+    index.commit(homework(1, 'rejected'))
+    assert not index.diff([homework(1, 'rejected')])
+    assert index.diff([homework(1, 'rejected', '2024-01-02T10:00:00Z')])
+
+
+def test_summary_status_prefers_active_homeworks():
+    index = ChangeIndex()
+    assert index.summary_status() is None
+    index.commit(homework(1, 'approved'))
+    assert index.summary_status() == 'approved'
+    index.commit(homework(2, 'reviewing'))
+    assert index.summary_status() == 'reviewing'
+
+
+def test_watermark_advances_on_every_response():
+    assert next_watermark({'current_date': 200}, 100) == 200
+    assert next_watermark({'homeworks': []}, 100) == 100
+    assert from_date(200, overlap=60) == 140
+    assert from_date(10, overlap=60) == 0
+
+
+def test_watermark_stops_at_undelivered_homework():
+    index = ChangeIndex()
+    item = homework(1, 'approved', '2024-01-01T10:00:00Z')
+    index.begin(item)
+    since = index.pending_since()
+    assert since == parse_date('2024-01-01T10:00:00Z')
+    assert next_watermark({'current_date': since + 600}, 0, since) == since
+    index.commit(item)
+    assert index.pending_since() is None
+
+
+def test_last_updated_is_latest_delivered_change():
+    index = ChangeIndex()
+    assert index.last_updated() is None
+    index.commit(homework(1, 'approved', '2024-01-01T10:00:00Z'))
+    index.commit(homework(2, 'approved', '2024-02-01T10:00:00Z'))
+    assert index.last_updated() == parse_date('2024-02-01T10:00:00Z')
@@ -0,0 +1,65 @@
+import asyncio
+
+import requests
+
+from digest import MESSAGE_LIMIT, DigestQueue, split_digest
+import engine
+import tests.check_utils as check_utils
+
+
+def test_split_digest_respects_limit():
+    texts = ['a' * 2000, 'b' * 2000, 'c' * 2000, 'd' * 5000]
+    chunks = split_digest(texts)
+    assert all(len(text) <= MESSAGE_LIMIT for text, _ in chunks)
+    assert [numbers for _, numbers in chunks] == [
+        {0, 1}, {2}, {3}, {3}
+    ]
+    assert ''.join(text for text, _ in chunks).replace('\n', '') == (
+        ''.join(texts)
+    )
+
+
+def test_digest_queue_merges_messages_within_window():
+    submitted = []
+    results = []
+
+    async def submit(chat_id, text, callback, key=None):
+        submitted.append((chat_id, text))
+        callback(True)
+
+    async def main():
+        digest = DigestQueue(submit, window=0.05)
+        await digest.add('chat', 'первый', results.append)
+        await digest.add('chat', 'второй', results.append)
+        await digest.add('other', 'третий', results.append)
+        await asyncio.sleep(0.1)
+        assert not len(digest)
+
+    asyncio.run(main())
+
+    assert sorted(submitted) == [('chat', 'первый\n\nвторой'),
+                                 ('other', 'третий')]
+    assert results == [True, True, True]
+
+
+def test_engine_sends_one_digest_per_chat(monkeypatch,
+                                          data_with_new_hw_status):
+    homework = data_with_new_hw_status['homeworks'][0]
+    data_with_new_hw_status['homeworks'].append(
+        dict(homework, id=1, homework_name='second.zip')
+    )
+    monkeypatch.setattr(requests, 'get', lambda *args, **kwargs: (
+        check_utils.MockResponseGET(data=data_with_new_hw_status)
+    ))
+    bot = check_utils.MockBot()
+    polling = engine.PollingEngine(bot, [engine.Tenant('token', 'chat')],
+                                   digest_window=10)
+
+    asyncio.run(polling.poll_once())
+
+    assert len(bot.sent) == 1
+    _, text = bot.sent[0]
+    assert 'hw123' in text and 'second' in text
+    assert polling.state(engine.Tenant('token', 'chat')).timestamp == (
+        data_with_new_hw_status['current_date']
+    )
@@ -0,0 +1,114 @@
+import asyncio
+import threading
+import time
+
+import requests
+
+from changes import parse_date
+import engine
+from storage import StateStore
+import tests.check_utils as check_utils
+
+
+def test_engine_polls_every_tenant(monkeypatch, data_with_new_hw_status):
+    monkeypatch.setattr(requests, 'get', lambda *args, **kwargs: (
+        check_utils.MockResponseGET(data=data_with_new_hw_status)
+    ))
+    tenants = [engine.Tenant(f'token{i}', f'chat{i}') for i in range(5)]
+    bot = check_utils.MockBot()
+    polling = engine.PollingEngine(bot, tenants, max_in_flight=2)
+
+    asyncio.run(polling.poll_once())
+    asyncio.run(polling.poll_once())
+
+    assert sorted(chat for chat, _ in bot.sent) == [
+        tenant.chat_id for tenant in tenants
+    ], 'Каждый получатель должен получить одно сообщение.'
+    current_date = data_with_new_hw_status['current_date']
+    assert all(
+        state.timestamp == current_date for state in polling.states.values()
+    )
+
+
+def test_engine_limits_in_flight_requests(monkeypatch):
+    lock = threading.Lock()
+    in_flight = [0, 0]
+
+    def slow_get(*args, **kwargs):
+        with lock:
+            in_flight[0] += 1
+            in_flight[1] = max(in_flight)
+        time.sleep(0.01)
+        with lock:
+            in_flight[0] -= 1
+        return check_utils.MockResponseGET()
+
+    monkeypatch.setattr(requests, 'get', slow_get)
+    tenants = [engine.Tenant(f'token{i}', f'chat{i}') for i in range(10)]
+    polling = engine.PollingEngine(check_utils.MockBot(), tenants,
+                                   max_in_flight=3)
+
+    asyncio.run(polling.poll_once())
+
+    assert in_flight[1] <= 3
+
+
+def test_engine_fetches_once_per_token(monkeypatch, data_with_new_hw_status):
+    calls = []
+
+    def get(*args, **kwargs):
+        calls.append(kwargs['headers']['Authorization'])
+        return check_utils.MockResponseGET(data=data_with_new_hw_status)
+
+    monkeypatch.setattr(requests, 'get', get)
+    tenants = [engine.Tenant('shared', f'chat{i}') for i in range(3)]
+    tenants.append(engine.Tenant('own', 'mentor'))
+    bot = check_utils.MockBot()
+    polling = engine.PollingEngine(bot, tenants)
+
+    asyncio.run(polling.poll_once())
+
+    assert sorted(calls) == ['OAuth own', 'OAuth shared']
+    assert sorted(chat for chat, _ in bot.sent) == sorted(
+        tenant.chat_id for tenant in tenants
+    )
+    assert len({text for _, text in bot.sent}) == 1
+
+
+def test_engine_keeps_failed_homework_in_window(
+        monkeypatch, data_with_new_hw_status):
+    monkeypatch.setattr(requests, 'get', lambda *args, **kwargs: (
+        check_utils.MockResponseGET(data=data_with_new_hw_status)
+    ))
+
+    class FailingBot:
+        def send_message(self, chat_id, text):
+            raise ConnectionError('Telegram недоступен')
+
+    tenant = engine.Tenant('token', 'chat')
+    polling = engine.PollingEngine(FailingBot(), [tenant])
+
+    asyncio.run(polling.poll_once())
+
+    homework = data_with_new_hw_status['homeworks'][0]
+    assert polling.state(tenant).timestamp <= parse_date(
+        homework['date_updated']
+    ), 'Недоставленная работа должна попасть в следующий запрос.'
+
+
+def test_engine_spreads_first_polls_without_loading_state(tmp_path):
+    store = StateStore(str(tmp_path / 'state.sqlite3'))
+    tenants = [engine.Tenant(f'token-{number}', 'chat')
+               for number in range(3)]
+    polling = engine.PollingEngine(check_utils.MockBot(), tenants,
+                                   store=store, retry_period=60)
+
+    async def run():
+        task = asyncio.create_task(polling.run(drain_timeout=1))
+        await asyncio.sleep(0.05)
+        assert len(polling.scheduler) == 3
+        assert not polling.states, 'Состояние читается при первом опросе.'
+        polling.stop()
+        await task
+
+    asyncio.run(run())
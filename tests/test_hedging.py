@@ -0,0 +1,99 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import time
+
+import pytest
+import requests
+
+from budget import RequestBudget
+import engine
+from exceptions import DeadlineExceededError
+import homework
+from hedging import Hedger, hedge_total
+from metrics import Histogram
+import tests.check_utils as check_utils
+
+
+def warmed_hedger(latency=0.01):
+    histogram = Histogram('test_seconds', 'test')
+    for _ in range(10):
+        histogram.observe(latency, stage='get_api_answer', outcome='ok')
+    return Hedger(min_samples=10, histogram=histogram)
+
+
+def run_hedged(hedger, delays):
+    delays = iter(delays)
+
+    def request():
+        delay, value = next(delays)
+        time.sleep(delay)
+        return value
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(2) as executor:
+            return await hedger.run(
+                lambda: loop.run_in_executor(executor, request)
+            )
+
+    return asyncio.run(main())
+
+
+def test_hedger_waits_for_samples():
+    hedger = Hedger(min_samples=10, histogram=Histogram('test', 'test'))
+    assert hedger.delay() is None
+
+
+def test_hedge_wins_over_slow_request():
+    fired = sum(hedge_total.values.values())
+    result = run_hedged(warmed_hedger(), [(0.5, 'first'), (0, 'second')])
+    assert result == 'second'
+    assert sum(hedge_total.values.values()) == fired + 2
+
+
+def test_fast_request_is_not_hedged():
+    assert run_hedged(warmed_hedger(), [(0, 'first')]) == 'first'
+
+
+def test_request_timeout_respects_deadline():
+    assert homework.request_timeout() == (homework.CONNECT_TIMEOUT,
+                                          homework.READ_TIMEOUT)
+    connect, read = homework.request_timeout(time.monotonic() + 1)
+    assert read <= 1
+    with pytest.raises(DeadlineExceededError):
+        homework.request_timeout(time.monotonic() - 1)
+
+
+def test_engine_enforces_poll_deadline(monkeypatch):
+    def hung_get(*args, **kwargs):
+        time.sleep(0.3)
+
+    monkeypatch.setattr(requests, 'get', hung_get)
+    bot = check_utils.MockBot()
+    polling = engine.PollingEngine(bot, [engine.Tenant('token', 'chat')],
+                                   poll_deadline=0.05)
+
+    asyncio.run(polling.poll_once())
+
+    assert 'не уложился' in bot.sent[0][1]
+
+
+def test_hedge_is_skipped_without_budget(monkeypatch):
+    calls = []
+
+    def slow_get(*args, **kwargs):
+        calls.append(args)
+        time.sleep(0.1)
+        return check_utils.MockResponseGET()
+
+    monkeypatch.setattr(requests, 'get', slow_get)
+    budget = RequestBudget(rate=1)
+    polling = engine.PollingEngine(
+        check_utils.MockBot(), [engine.Tenant('token', 'chat')],
+        hedger=warmed_hedger(), budget=budget
+    )
+
+    asyncio.run(polling.poll_once())
+
+    assert len(calls) == 1, 'Дубль не должен превышать бюджет.'
+    assert budget.stats()['granted'] == 1
@@ -0,0 +1,68 @@
+import asyncio
+
+import requests
+
+import engine
+from exceptions import IncorrectResponseCodeError
+from incidents import IncidentTracker, format_duration
+import tests.check_utils as check_utils
+
+
+def test_repeated_errors_notify_once():
+    clock = check_utils.FakeClock()
+    tracker = IncidentTracker(clock)
+    first = tracker.failure(IncorrectResponseCodeError('тело 1'), 'api')
+    assert first == 'Сбой в работе программы: тело 1'
+    for number in range(2, 5):
+        clock.now += 600
+        assert tracker.failure(
+            IncorrectResponseCodeError(f'тело {number}'), 'api'
+        ) is None, 'Повтор того же сбоя не должен слать сообщение.'
+    message = tracker.recovered()
+    assert 'Сбоев подряд: 4 за 30 мин' in message
+    assert tracker.recovered() is None
+
+
+def test_other_error_starts_new_incident():
+    tracker = IncidentTracker(check_utils.FakeClock())
+    assert tracker.failure(ConnectionError('нет сети'), 'api')
+    assert tracker.failure(IncorrectResponseCodeError('500'), 'api')
+
+
+def test_undelivered_notification_is_retried():
+    tracker = IncidentTracker(check_utils.FakeClock())
+    assert tracker.failure(ConnectionError('нет сети'))
+    tracker.undelivered()
+    assert tracker.failure(ConnectionError('нет сети'))
+
+
+def test_silent_incident_recovers_without_message():
+    tracker = IncidentTracker(check_utils.FakeClock())
+    tracker.failure(ConnectionError('нет сети'))
+    tracker.undelivered()
+    assert tracker.recovered() is None
+
+
+def test_format_duration():
+    assert format_duration(0) == '0 с'
+    assert format_duration(3725) == '1 ч 2 мин 5 с'
+    assert format_duration(120) == '2 мин'
+
+
+def test_engine_sends_incident_and_recovery(monkeypatch):
+    responses = iter([500, 502, 200])
+
+    def get(*args, **kwargs):
+        return check_utils.MockResponseGET(http_status=next(responses))
+
+    monkeypatch.setattr(requests, 'get', get)
+    bot = check_utils.MockBot()
+    polling = engine.PollingEngine(bot, [engine.Tenant('token', 'chat')])
+
+    for _ in range(3):
+        asyncio.run(polling.poll_once())
+
+    sent = [text for _, text in bot.sent]
+    assert len(sent) == 2
+    assert sent[0].startswith('Сбой в работе программы')
+    assert sent[1].startswith('Работа восстановлена. Сбоев подряд: 2')
@@ -0,0 +1,47 @@
+import logging
+
+from log_config import DeferredQueueHandler, LogListener, create_sink
+
+
+class Lazy:
+    calls = 0
+
+    def __str__(self):
+        Lazy.calls += 1
+        return 'lazy'
+
+
+def test_listener_writes_records_in_batches(tmp_path):
+    path = tmp_path / 'bot.log'
+    listener = LogListener([create_sink(str(path))])
+    test_logger = logging.getLogger('test_log_config')
+    test_logger.propagate = False
+    test_logger.setLevel(logging.DEBUG)
+    handler = DeferredQueueHandler(listener.queue)
+    test_logger.addHandler(handler)
+    try:
+        test_logger.debug('значение %s', Lazy())
+        assert Lazy.calls == 0, 'Сообщение не должно собираться сразу.'
+        listener.start()
+        for number in range(100):
+            test_logger.info('запись %d', number)
+    finally:
+        test_logger.removeHandler(handler)
+        listener.stop()
+
+    lines = path.read_text(encoding='utf-8').splitlines()
+    assert len(lines) == 101
+    assert lines[0].endswith('значение lazy')
+    assert lines[-1].endswith('запись 99')
+
+
+def test_sinks_can_be_replaced(tmp_path):
+    first, second = tmp_path / 'first.log', tmp_path / 'second.log'
+    listener = LogListener([create_sink(str(first))])
+    listener.start()
+    record = logging.makeLogRecord({'msg': 'запись', 'levelno': 20})
+    listener.queue.put(record)
+    listener.replace_handlers([create_sink(str(second))])
+    listener.queue.put(record)
+    listener.stop()
+    assert second.read_text(encoding='utf-8')
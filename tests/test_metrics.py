@@ -0,0 +1,65 @@
+import pytest
+import requests
+
+import homework
+import tests.check_utils as check_utils
+from metrics import Registry, observe, stage_total, start_metrics_server
+
+
+def stage_count(stage, outcome):
+    return stage_total.values.get(
+        (('outcome', outcome), ('stage', stage)), 0
+    )
+
+
+def test_stage_outcomes_are_counted(monkeypatch):
+    def raise_connection_error(*args, **kwargs):
+        raise requests.RequestException('Something wrong')
+
+    before = stage_count('get_api_answer', 'connection_error')
+    monkeypatch.setattr(requests, 'get', raise_connection_error)
+    with pytest.raises(ConnectionError):
+        homework.get_api_answer(0)
+    assert stage_count('get_api_answer', 'connection_error') == before + 1
+
+    before = stage_count('parse_status', 'parse_error')
+    with pytest.raises(KeyError):
+        homework.parse_status({'status': 'approved'})
+    assert stage_count('parse_status', 'parse_error') == before + 1
+
+    before = stage_count('get_api_answer', 'non_200')
+    monkeypatch.setattr(requests, 'get', lambda *args, **kwargs: (
+        check_utils.MockResponseGET(http_status=500)
+    ))
+    with pytest.raises(Exception):
+        homework.get_api_answer(0)
+    assert stage_count('get_api_answer', 'non_200') == before + 1
+
+
+def test_metrics_endpoint_renders_prometheus_text():
+    registry = Registry()
+    histogram = registry.histogram('test_seconds', 'Тест', buckets=(0.1, 1))
+    histogram.observe(0.05, stage='poll')
+    histogram.observe(0.5, stage='poll')
+    registry.counter('test_total', 'Тест').inc(stage='poll')
+    server = start_metrics_server(0, metrics_registry=registry)
+    try:
+        response = requests.get(
+            f'http://127.0.0.1:{server.server_port}/metrics', timeout=1
+        )
+    finally:
+        server.shutdown()
+        server.server_close()
+    text = response.text
+    assert '# TYPE test_seconds histogram' in text
+    assert 'test_seconds_bucket{stage="poll",le="0.1"} 1' in text
+    assert 'test_seconds_bucket{stage="poll",le="+Inf"} 2' in text
+    assert 'test_seconds_count{stage="poll"} 2' in text
+    assert 'test_total{stage="poll"} 1' in text
+
+
+def test_observe_reraises():
+    with pytest.raises(ValueError):
+        with observe('test_stage'):
+            raise ValueError
+    assert stage_count('test_stage', 'parse_error') >= 1
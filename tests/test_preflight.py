@@ -0,0 +1,98 @@
+import asyncio
+from http import HTTPStatus
+import threading
+import time
+
+import pytest
+import requests
+import telebot
+
+import engine
+from exceptions import NotTokenError
+from preflight import INVALID, UNKNOWN, VALID, check_chat, preflight
+import tests.check_utils as check_utils
+
+
+class Bot:
+    def __init__(self, missing=(), delay=0):
+        self.missing = missing
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def get_chat(self, chat_id):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        with self.lock:
+            self.active -= 1
+        if chat_id in self.missing:
+            raise telebot.apihelper.ApiTelegramException(
+                'getChat', None,
+                {'error_code': 400, 'description': 'Bad Request: chat not found'}
+            )
+        return {'id': chat_id}
+
+
+def fake_api(monkeypatch, dead_tokens):
+    calls = []
+
+    def get(*args, headers=None, **kwargs):
+        calls.append(headers['Authorization'])
+        if headers['Authorization'].split()[-1] in dead_tokens:
+            return check_utils.MockResponseGET(
+                http_status=HTTPStatus.UNAUTHORIZED
+            )
+        return check_utils.MockResponseGET()
+
+    monkeypatch.setattr(requests, 'get', get)
+    return calls
+
+
+def test_dead_credentials_are_quarantined(monkeypatch):
+    calls = fake_api(monkeypatch, dead_tokens={'expired'})
+    tenants = [engine.Tenant('good', 'chat1'), engine.Tenant('good', 'chat2'),
+               engine.Tenant('expired', 'chat3'),
+               engine.Tenant('other', 'gone')]
+
+    report = asyncio.run(preflight(tenants, Bot(missing={'gone'})))
+
+    assert report.valid == tenants[:2]
+    assert set(report.quarantined) == set(tenants[2:])
+    assert len(calls) == 3, 'Каждый токен проверяется один раз.'
+    assert 'на карантине 2' in report.summary()
+
+
+def test_checks_run_with_bounded_parallelism(monkeypatch):
+    fake_api(monkeypatch, dead_tokens=())
+    bot = Bot(delay=0.05)
+    tenants = [engine.Tenant('token', f'chat{number}')
+               for number in range(12)]
+
+    started = time.monotonic()
+    asyncio.run(preflight(tenants, bot, concurrency=4))
+
+    assert bot.peak <= 4
+    assert bot.peak > 1
+    assert time.monotonic() - started < 12 * 0.05
+
+
+def test_unreachable_telegram_does_not_quarantine():
+    class Offline:
+        def get_chat(self, chat_id):
+            raise requests.exceptions.ConnectionError('нет сети')
+
+    assert check_chat(Offline(), 'chat')[0] == UNKNOWN
+    assert check_chat(Bot(missing={'chat'}), 'chat')[0] == INVALID
+    assert check_chat(Bot(), 'chat')[0] == VALID
+
+
+def test_engine_refuses_to_start_when_all_quarantined(monkeypatch):
+    fake_api(monkeypatch, dead_tokens={'expired'})
+    monkeypatch.setenv('TELEGRAM_TOKEN', '1234:test')
+    monkeypatch.setattr(telebot, 'TeleBot', lambda token: Bot())
+
+    with pytest.raises(NotTokenError):
+        engine.check_preflight([engine.Tenant('expired', 'chat')])
@@ -0,0 +1,73 @@
+import threading
+
+import pytest
+import telebot
+
+from exceptions import ShutdownRequested
+from ratelimit import TelegramRateLimiter, TokenBucket, get_retry_after
+
+
+class FakeTime:
+    def __init__(self):
+        self.now = 0.0
+
+    def clock(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def make_limiter(**kwargs):
+    fake = FakeTime()
+    return TelegramRateLimiter(sleep=fake.sleep, clock=fake.clock,
+                               **kwargs), fake
+
+
+def test_bucket_spreads_requests():
+    fake = FakeTime()
+    bucket = TokenBucket(rate=2, clock=fake.clock)
+    assert [bucket.reserve() for _ in range(4)] == [0, 0, 0.5, 1.0]
+
+
+def test_limiter_respects_global_and_chat_limits():
+    limiter, fake = make_limiter(global_rate=10, chat_rate=1)
+    for chat in range(20):
+        limiter.acquire(chat)
+    assert 0.9 <= fake.now <= 1.1
+    stats = limiter.stats()
+    assert stats['acquired'] == 20
+    assert stats['throttled'] > 0
+    assert stats['waiting'] == 0
+
+
+def test_limiter_respects_chat_limit():
+    limiter, fake = make_limiter(global_rate=100, chat_rate=1)
+    for _ in range(3):
+        limiter.acquire('chat')
+    assert fake.now == 2
+
+
+def test_limiter_honours_retry_after():
+    limiter, fake = make_limiter()
+    error = telebot.apihelper.ApiTelegramException(
+        'sendMessage', None, {
+            'error_code': 429,
+            'description': 'Too Many Requests: retry after 5',
+            'parameters': {'retry_after': 5},
+        }
+    )
+    assert get_retry_after(error) == 5
+    limiter.observe_error('chat', error)
+    limiter.acquire('chat')
+    assert fake.now >= 5
+
+
+def test_limiter_wait_is_interrupted_by_halt():
+    halt = threading.Event()
+    halt.set()
+    limiter = TelegramRateLimiter(chat_rate=1, sleep=halt.wait,
+                                  clock=FakeTime().clock)
+    limiter.acquire('chat')
+    with pytest.raises(ShutdownRequested):
+        limiter.acquire('chat')
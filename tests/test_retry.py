@@ -0,0 +1,122 @@
+import asyncio
+
+import requests
+import telebot
+
+import engine
+from retry import (AMBIGUOUS, CHAT_GONE, PERMANENT, TRANSIENT, DeliveryLog,
+                   RetryPolicy, classify, dedup_key)
+import tests.check_utils as check_utils
+
+
+def api_error(code, description):
+    return telebot.apihelper.ApiTelegramException(
+        'sendMessage', None, {'error_code': code, 'description': description}
+    )
+
+
+class FlakyBot:
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.sent = []
+
+    def send_message(self, chat_id, text):
+        self.sent.append((chat_id, text))
+        if self.errors:
+            raise self.errors.pop(0)
+
+
+def test_errors_are_classified():
+    assert classify(ConnectionError('сеть')) == TRANSIENT
+    assert classify(requests.exceptions.ConnectTimeout()) == TRANSIENT
+    assert classify(requests.exceptions.ReadTimeout()) == AMBIGUOUS
+    assert classify(api_error(429, 'Too Many Requests')) == TRANSIENT
+    assert classify(api_error(502, 'Bad Gateway')) == TRANSIENT
+    assert classify(api_error(403, 'Forbidden: bot was blocked')) == CHAT_GONE
+    assert classify(api_error(400, 'Bad Request: chat not found')) == (
+        CHAT_GONE
+    )
+    assert classify(api_error(400, 'Bad Request: message is empty')) == (
+        PERMANENT
+    )
+    assert classify(ValueError('ошибка')) == PERMANENT
+
+
+def test_delay_grows_exponentially_up_to_cap():
+    policy = RetryPolicy(base_delay=1, max_delay=10, rand=lambda: 1)
+    assert [policy.delay(attempt) for attempt in range(5)] == [
+        1, 2, 4, 8, 10
+    ]
+    jittered = RetryPolicy(base_delay=1, rand=lambda: 0.5)
+    assert jittered.delay(2) == 2
+
+
+def test_transient_errors_are_retried():
+    sleeps = []
+    bot = FlakyBot([ConnectionError('сеть'), api_error(500, 'Internal')])
+    policy = RetryPolicy(attempts=3, sleep=sleeps.append, rand=lambda: 1)
+    assert policy.call(lambda: bot.send_message('chat', 'text')) is None
+    assert len(bot.sent) == 3
+    assert sleeps == [1, 2]
+
+
+def test_permanent_error_is_not_retried():
+    bot = FlakyBot([api_error(403, 'Forbidden: bot was blocked by the user')])
+    policy = RetryPolicy(sleep=lambda delay: None)
+    assert policy.call(lambda: bot.send_message('chat', 'text')) == CHAT_GONE
+    assert len(bot.sent) == 1
+
+
+def test_delivery_log_forgets_old_keys():
+    clock = check_utils.FakeClock()
+    log = DeliveryLog(ttl=10, clock=clock)
+    log.add('key')
+    assert 'key' in log
+    clock.now = 11
+    assert 'key' not in log
+
+
+def test_ambiguous_timeout_is_not_resent():
+    bot = FlakyBot([requests.exceptions.ReadTimeout()])
+    polling = engine.PollingEngine(
+        bot, [], retry=RetryPolicy(sleep=lambda delay: None)
+    )
+    key = dedup_key('token', {'homework_name': 'hw', 'status': 'approved'})
+    assert polling.send('chat', 'text', key)
+    assert polling.send('chat', 'text', key)
+    assert len(bot.sent) == 1, 'Сообщение без ответа могло дойти.'
+
+
+def test_same_text_for_different_notifications_is_sent():
+    bot = FlakyBot([requests.exceptions.ReadTimeout()])
+    polling = engine.PollingEngine(
+        bot, [], retry=RetryPolicy(sleep=lambda delay: None)
+    )
+    homework = {'homework_name': 'hw', 'status': 'reviewing'}
+    assert polling.send('chat', 'text', dedup_key('first', homework))
+    assert polling.send('chat', 'text', dedup_key('second', homework))
+    assert polling.send('chat', 'text')
+    assert polling.send('chat', 'text')
+    assert len(bot.sent) == 4
+
+
+def test_blocked_chat_disables_tenant(monkeypatch, data_with_new_hw_status):
+    calls = []
+
+    def get(*args, **kwargs):
+        calls.append(kwargs)
+        return check_utils.MockResponseGET(data=data_with_new_hw_status)
+
+    monkeypatch.setattr(requests, 'get', get)
+    bot = FlakyBot([api_error(403, 'Forbidden: bot was blocked by the user')])
+    tenant = engine.Tenant('token', 'chat')
+    polling = engine.PollingEngine(
+        bot, [tenant], retry=RetryPolicy(sleep=lambda delay: None)
+    )
+
+    asyncio.run(polling.poll_once())
+    asyncio.run(polling.poll_once())
+
+    assert polling.disabled == {'chat'}
+    assert len(bot.sent) == 1
+    assert len(calls) == 1, 'Отключённый получатель не опрашивается.'
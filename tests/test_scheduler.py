@@ -0,0 +1,82 @@
+from scheduler import COLD, HOT, WARM, PollScheduler
+import tests.check_utils as check_utils
+
+
+def make_scheduler(**kwargs):
+    clock = check_utils.FakeClock()
+    return PollScheduler(clock=clock, jitter=0, **kwargs), clock
+
+
+def test_status_changes_interval():
+    scheduler, clock = make_scheduler(
+        intervals={'reviewing': 60, 'approved': 3600}
+    )
+    scheduler.reschedule('reviewing', 'reviewing')
+    scheduler.reschedule('approved', 'approved')
+    scheduler.reschedule('unknown')
+
+    clock.now = 60
+    assert scheduler.pop_due() == ['reviewing']
+    clock.now = 600
+    assert scheduler.pop_due() == ['unknown']
+    clock.now = 3600
+    assert scheduler.pop_due() == ['approved']
+    assert not len(scheduler)
+
+
+def test_terminal_status_stops_polling():
+    scheduler, clock = make_scheduler(intervals={'approved': None})
+    scheduler.schedule('tenant', 0)
+    assert scheduler.reschedule('tenant', 'approved') is None
+    assert 'tenant' not in scheduler
+    clock.now = 10 ** 6
+    assert scheduler.pop_due() == []
+
+
+def test_reschedule_replaces_previous_entry():
+    scheduler, clock = make_scheduler()
+    for delay in range(1000):
+        scheduler.schedule('tenant', delay)
+    assert len(scheduler) == 1
+    assert len(scheduler.heap) < 200
+    clock.now = 998
+    assert scheduler.pop_due() == []
+    assert scheduler.next_delay(600) == 1
+    clock.now = 999
+    assert scheduler.pop_due() == ['tenant']
+
+
+def test_jitter_spreads_polls():
+    scheduler = PollScheduler(jitter=0.1)
+    intervals = {scheduler.interval_for(None) for _ in range(100)}
+    assert len(intervals) > 1
+    assert all(540 <= interval <= 660 for interval in intervals)
+
+
+def test_quiet_tenants_drop_to_cold_tier():
+    scheduler, clock = make_scheduler(cold_interval=6000, cold_after=100,
+                                      wall_clock=lambda: 1000)
+    assert scheduler.tier_for('reviewing', 0) == HOT
+    assert scheduler.tier_for('rejected', 950) == HOT
+    assert scheduler.tier_for('rejected', 0) == COLD
+    assert scheduler.tier_for('approved', 950) == WARM
+    assert scheduler.tier_for(None) == WARM
+
+    scheduler.reschedule('finished', 'approved', last_updated=0)
+    scheduler.reschedule('student', 'reviewing', last_updated=0)
+    assert scheduler.tier_counts() == {HOT: 1, WARM: 0, COLD: 1}
+    clock.now = 3600
+    assert scheduler.pop_due() == ['student']
+    clock.now = 6000
+    assert scheduler.pop_due() == ['finished']
+
+
+def test_new_submission_promotes_cold_tenant():
+    scheduler, clock = make_scheduler(cold_after=100,
+                                      wall_clock=lambda: 1000)
+    scheduler.reschedule('tenant', 'approved', last_updated=0)
+    assert scheduler.tiers['tenant'] == COLD
+    scheduler.reschedule('tenant', 'reviewing', last_updated=990)
+    assert scheduler.tiers['tenant'] == HOT
+    clock.now = 300
+    assert scheduler.pop_due() == ['tenant']
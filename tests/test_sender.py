@@ -0,0 +1,69 @@
+import asyncio
+from functools import partial
+import threading
+import time
+
+from retry import RetryPolicy
+from sender import SenderPool
+
+
+def test_results_reach_callbacks_and_queue_drains():
+    sent = []
+    results = []
+
+    def send(chat_id, text):
+        time.sleep(0.01)
+        sent.append((chat_id, text))
+        return chat_id != 'broken'
+
+    async def scenario():
+        pool = SenderPool(send, workers=2, maxsize=2)
+        pool.start()
+        for chat_id in ('a', 'b', 'broken', 'c'):
+            await pool.submit(chat_id, 'text', results.append)
+            assert len(pool) <= 2
+        await pool.shutdown(timeout=1)
+        assert not pool.running
+
+    asyncio.run(scenario())
+    assert len(sent) == 4
+    assert sorted(results) == [False, True, True, True]
+
+
+def test_failing_send_is_reported_as_false():
+    results = []
+
+    def send(chat_id, text):
+        raise RuntimeError('network')
+
+    async def scenario():
+        pool = SenderPool(send, workers=1)
+        pool.start()
+        await pool.submit('chat', 'text', results.append)
+        await pool.shutdown(timeout=1)
+
+    asyncio.run(scenario())
+    assert results == [False]
+
+
+def test_shutdown_interrupts_retry_pauses():
+    halt = threading.Event()
+    policy = RetryPolicy(sleep=halt.wait, rand=lambda: 1, base_delay=60)
+
+    def send(chat_id, text):
+        return policy.call(partial(fail, ConnectionError('сеть'))) is None
+
+    async def scenario():
+        pool = SenderPool(send, workers=1, halt=halt)
+        pool.start()
+        await pool.submit('chat', 'text')
+        await pool.shutdown(timeout=0.05)
+
+    started = time.monotonic()
+    asyncio.run(scenario())
+    assert time.monotonic() - started < 1
+    assert halt.is_set()
+
+
+def fail(error):
+    raise error
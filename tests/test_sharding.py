@@ -0,0 +1,90 @@
+import multiprocessing
+import os
+import time
+
+from engine import Tenant
+from metrics import Registry
+from sharding import HashRing, Supervisor, assign
+
+
+def test_ring_moves_few_keys_on_resize():
+    keys = [f'token{number}' for number in range(2000)]
+    before = HashRing(range(4))
+    after = HashRing(range(5))
+    moved = sum(before.node_for(key) != after.node_for(key) for key in keys)
+    assert moved < len(keys) * 0.3, (
+        'При добавлении пятого шарда должна переехать примерно пятая часть.'
+    )
+    assert all(after.node_for(key) == 4 for key in keys
+               if before.node_for(key) != after.node_for(key))
+
+
+def test_ring_remove_restores_assignment():
+    ring = HashRing(range(3))
+    ring.add(3)
+    ring.remove(3)
+    assert all(ring.node_for(key) == HashRing(range(3)).node_for(key)
+               for key in map(str, range(100)))
+
+
+def test_assign_keeps_token_subscribers_together():
+    tenants = [Tenant(f'token{number % 50}', str(number))
+               for number in range(200)]
+    groups = assign(tenants, 4)
+    assert sum(map(len, groups)) == len(tenants)
+    owners = {}
+    for number, group in enumerate(groups):
+        for tenant in group:
+            assert owners.setdefault(tenant.token, number) == number
+
+
+def crashing_shard(number, tenants, shards, snapshots):
+    metrics = Registry()
+    metrics.counter('homework_test_total', 'test').inc(len(tenants))
+    snapshots.put((number, os.getpid(), metrics.snapshot()))
+    time.sleep(0.05)
+    raise SystemExit(1)
+
+
+def test_supervisor_restarts_crashed_shard_and_keeps_metrics():
+    tenants = [Tenant(f'token{number}', str(number)) for number in range(10)]
+    supervisor = Supervisor(tenants, 2, target=crashing_shard,
+                            restart_delay=0,
+                            context=multiprocessing.get_context('fork'))
+    supervisor.start()
+    first = dict(supervisor.processes)
+    try:
+        deadline = time.monotonic() + 1.5
+        while (time.monotonic() < deadline
+               and any(supervisor.processes[number] is first[number]
+                       for number in first)):
+            supervisor.collect(0.05)
+            supervisor.check()
+    finally:
+        supervisor.stop()
+    assert all(supervisor.processes[number] is not first[number]
+               for number in first), 'Упавшие шарды должны перезапуститься.'
+    total = next(line for line in supervisor.render().splitlines()
+                 if line.startswith('homework_test_total '))
+    assert int(total.split()[1]) >= len(tenants), (
+        'Метрики упавших шардов не должны теряться.'
+    )
+
+
+def finished_shard(number, tenants, shards, snapshots):
+    raise SystemExit(0)
+
+
+def test_supervisor_does_not_restart_finished_shard():
+    supervisor = Supervisor([Tenant('token', 'chat')], 1,
+                            target=finished_shard, restart_delay=0,
+                            context=multiprocessing.get_context('fork'))
+    supervisor.start()
+    try:
+        supervisor.processes[0].join(1)
+        for _ in range(3):
+            supervisor.check()
+    finally:
+        supervisor.stop()
+    assert not supervisor.processes
+    assert not supervisor.restart_at
@@ -0,0 +1,65 @@
+import asyncio
+import inspect
+import signal
+import time
+
+import pytest
+import requests
+import telebot
+
+import engine
+from exceptions import ShutdownRequested
+from shutdown import GracefulShutdown
+from storage import StateStore
+import tests.check_utils as check_utils
+
+
+def test_signal_is_deferred_while_working():
+    shutdown = GracefulShutdown()
+    with shutdown.working():
+        shutdown.handle(signal.SIGTERM)
+    assert shutdown.requested.is_set()
+    with pytest.raises(ShutdownRequested):
+        shutdown.handle(signal.SIGTERM)
+
+
+def test_main_stops_on_sigterm_during_sleep(monkeypatch, homework_module):
+    monkeypatch.setattr(requests, 'get', lambda *args, **kwargs: (
+        check_utils.MockResponseGET()
+    ))
+    monkeypatch.setattr(telebot, 'TeleBot', check_utils.MockBot)
+    monkeypatch.setattr(
+        time, 'sleep', lambda seconds: signal.raise_signal(signal.SIGTERM)
+    )
+    previous = signal.getsignal(signal.SIGTERM)
+
+    inspect.unwrap(homework_module.main)()
+
+    assert signal.getsignal(signal.SIGTERM) is previous
+
+
+def test_engine_drains_in_flight_polls(
+        monkeypatch, tmp_path, data_with_new_hw_status):
+    def slow_get(*args, **kwargs):
+        time.sleep(0.2)
+        return check_utils.MockResponseGET(data=data_with_new_hw_status)
+
+    monkeypatch.setattr(requests, 'get', slow_get)
+    tenant = engine.Tenant('token', 'chat')
+    bot = check_utils.MockBot()
+    path = str(tmp_path / 'state.sqlite3')
+    polling = engine.PollingEngine(bot, [tenant], retry_period=0.01,
+                                   store=StateStore(path))
+
+    async def run():
+        task = asyncio.create_task(polling.run(drain_timeout=1))
+        await asyncio.sleep(0.1)
+        polling.stop()
+        await task
+
+    asyncio.run(run())
+
+    assert len(bot.sent) == 1, 'Начатый опрос должен завершиться.'
+    assert StateStore(path).get_watermark(tenant.key) == (
+        data_with_new_hw_status['current_date']
+    )
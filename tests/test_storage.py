@@ -0,0 +1,183 @@
+import asyncio
+
+import requests
+
+import engine
+from retry import PERMANENT, Undelivered
+import tests.check_utils as check_utils
+from storage import StateStore
+
+
+def test_state_survives_restart(tmp_path):
+    path = tmp_path / 'state.sqlite3'
+    store = StateStore(path, batch_size=10)
+    store.set_watermark('tenant', 123)
+    store.set_status('tenant', 'hw.zip', 'reviewing')
+    store.set_status('tenant', 'hw.zip', 'approved')
+    store.close()
+
+    store = StateStore(path)
+    assert store.get_watermark('tenant') == 123
+    assert store.get_statuses('tenant') == {'hw.zip': ('approved', None)}
+    assert store.get_watermark('other') == 0
+    assert store.get_statuses('other') == {}
+    store.close()
+
+
+def test_engine_does_not_repeat_after_restart(
+        tmp_path, monkeypatch, data_with_new_hw_status
+):
+    monkeypatch.setattr(requests, 'get', lambda *args, **kwargs: (
+        check_utils.MockResponseGET(data=data_with_new_hw_status)
+    ))
+    bot = check_utils.MockBot()
+    tenant = engine.Tenant('token', 'chat')
+    for _ in range(2):
+        store = StateStore(tmp_path / 'state.sqlite3')
+        polling = engine.PollingEngine(bot, [tenant], store=store)
+        asyncio.run(polling.poll_once())
+        store.close()
+
+    assert len(bot.sent) == 1
+    assert StateStore(tmp_path / 'state.sqlite3').get_watermark(
+        tenant.key
+    ) == data_with_new_hw_status['current_date']
+
+
+def test_outbox_roundtrip(tmp_path):
+    store = StateStore(tmp_path / 'state.sqlite3')
+    first = store.add_outbox('tenant', 'chat', 'первое', 'hw', 'approved')
+    store.add_outbox('tenant', 'chat', 'второе')
+    store.delete_outbox(first)
+    store.close()
+
+    store = StateStore(tmp_path / 'state.sqlite3')
+    assert [row[-1] for row in store.get_outbox()] == ['второе']
+    store.close()
+
+
+def test_engine_replays_outbox_after_crash(tmp_path, monkeypatch):
+    monkeypatch.setattr(requests, 'get', lambda *args, **kwargs: (
+        check_utils.MockResponseGET(data={'homeworks': [],
+                                          'current_date': 100})
+    ))
+    bot = check_utils.MockBot()
+    tenant = engine.Tenant('token', 'chat')
+    path = tmp_path / 'state.sqlite3'
+    store = StateStore(path)
+    store.add_outbox(tenant.key, tenant.chat_id, 'не доставлено', '1',
+                     'approved', '2024-01-01T10:00:00Z')
+    store.add_outbox('removed', 'old', 'лишнее')
+    store.close()
+
+    store = StateStore(path)
+    polling = engine.PollingEngine(bot, [tenant], store=store,
+                                   retry_period=0.01)
+
+    async def run():
+        task = asyncio.create_task(polling.run(drain_timeout=1))
+        await asyncio.sleep(0.05)
+        polling.stop()
+        await task
+
+    asyncio.run(run())
+
+    assert bot.sent == [('chat', 'не доставлено')]
+    store = StateStore(path)
+    assert [row[1] for row in store.get_outbox()] == ['removed'], (
+        'Записи чужих получателей остаются в outbox.'
+    )
+    assert store.get_statuses(tenant.key) == {
+        '1': ('approved', '2024-01-01T10:00:00Z')
+    }
+    store.close()
+
+
+def test_engines_sharing_store_replay_only_own_rows(tmp_path, monkeypatch):
+    monkeypatch.setattr(requests, 'get', lambda *args, **kwargs: (
+        check_utils.MockResponseGET(data={'homeworks': [],
+                                          'current_date': 100})
+    ))
+    bot = check_utils.MockBot()
+    first = engine.Tenant('tok1', 'c1')
+    second = engine.Tenant('tok2', 'c2')
+    path = tmp_path / 'state.sqlite3'
+    store = StateStore(path)
+    for tenant in (first, second):
+        store.add_outbox(tenant.key, tenant.chat_id, tenant.chat_id, '1',
+                         'approved', '2024-01-01T10:00:00Z')
+    store.close()
+
+    async def run(polling):
+        task = asyncio.create_task(polling.run(drain_timeout=1))
+        await asyncio.sleep(0.05)
+        polling.stop()
+        await task
+
+    for tenant in (first, second):
+        asyncio.run(run(engine.PollingEngine(
+            bot, [tenant], store=StateStore(path), retry_period=60
+        )))
+
+    assert sorted(bot.sent) == [('c1', 'c1'), ('c2', 'c2')]
+    store = StateStore(path)
+    assert store.get_outbox() == []
+    store.close()
+
+
+def test_unbatched_store_does_not_lock_shared_database(tmp_path):
+    path = str(tmp_path / 'state.sqlite3')
+    first = StateStore(path, batch_size=1, busy_timeout=0.1)
+    second = StateStore(path, batch_size=1, busy_timeout=0.1)
+    first.set_watermark('first', 1)
+    second.set_watermark('second', 2)
+    assert first.get_watermark('second') == 2
+    assert second.get_watermark('first') == 1
+
+
+def test_failed_notification_is_redelivered_from_outbox(
+        tmp_path, monkeypatch, data_with_new_hw_status):
+    monkeypatch.setattr(requests, 'get', lambda *args, **kwargs: (
+        check_utils.MockResponseGET(data=data_with_new_hw_status)
+    ))
+    bot = check_utils.MockBot()
+    failures = [ConnectionError('Telegram недоступен')]
+
+    def send_message(chat_id, text):
+        if failures:
+            raise failures.pop()
+        bot.sent.append((chat_id, text))
+
+    bot.send_message = send_message
+    tenant = engine.Tenant('token', 'chat')
+    path = tmp_path / 'state.sqlite3'
+    polling = engine.PollingEngine(bot, [tenant], store=StateStore(path))
+    polling.redelivery_delay = 0.05
+
+    async def poll_and_wait():
+        polling.sender.start()
+        await polling.run_cycle()
+        await asyncio.sleep(0.2)
+        await polling.shutdown_sender()
+
+    asyncio.run(poll_and_wait())
+    polling.store.close()
+
+    assert len(bot.sent) == 1, 'Уведомление доставлено без нового опроса.'
+    store = StateStore(path)
+    assert store.get_outbox() == []
+    assert store.get_statuses(tenant.key)
+    store.close()
+
+
+def test_rejected_notification_leaves_outbox(tmp_path):
+    store = StateStore(tmp_path / 'state.sqlite3')
+    polling = engine.PollingEngine(check_utils.MockBot(), [], store=store)
+    tenant = engine.Tenant('token', 'chat')
+    state = polling.state(tenant)
+    homework = {'id': 1, 'status': 'approved', 'date_updated': None}
+    outbox_id = store.add_outbox(tenant.key, tenant.chat_id, 'текст', '1')
+    polling.acknowledge(tenant, state, homework, outbox_id, 'текст', 0,
+                        Undelivered(PERMANENT))
+    assert store.get_outbox() == []
+    store.close()
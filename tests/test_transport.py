@@ -0,0 +1,43 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from transport import PooledSession
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = b'{"homeworks": [], "current_date": 1}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def local_url():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_port}/'
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.parametrize('keep_alive, connections', ((True, 1), (False, 3)))
+def test_session_reuses_connections(local_url, keep_alive, connections):
+    session = PooledSession(pool_size=2, keep_alive=keep_alive)
+    for _ in range(3):
+        assert session.get(url=local_url, timeout=1).json()['current_date']
+    stats = session.stats()
+    session.close()
+    assert stats['requests'] == 3
+    assert stats['connections'] == connections
+    assert stats['reused'] == 3 - connections
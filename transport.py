@@ -0,0 +1,86 @@
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_POOL_SIZE = 50
+
+
+class CountingAdapter(HTTPAdapter):
+    """Адаптер, считающий установленные TCP/TLS соединения."""
+
+    def __init__(self, **kwargs):
+        """Счётчик заводится до создания пулов."""
+        self.connections = 0
+        self.lock = threading.Lock()
+        super().__init__(**kwargs)
+
+    def count_connection(self):
+        """Учёт нового соединения."""
+        with self.lock:
+            self.connections += 1
+
+    def counting_connection(self, connection_cls):
+        """Класс соединения, сообщающий адаптеру о каждом connect()."""
+        adapter = self
+
+        class CountingConnection(connection_cls):
+            def connect(self):
+                adapter.count_connection()
+                super().connect()
+
+        return CountingConnection
+
+    def init_poolmanager(self, *args, **kwargs):
+        """Пулы с подсчётом соединений."""
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            scheme: type(pool_cls.__name__, (pool_cls,), {
+                'ConnectionCls': self.counting_connection(
+                    pool_cls.ConnectionCls
+                )
+            })
+            for scheme, pool_cls
+            in self.poolmanager.pool_classes_by_scheme.items()
+        }
+
+
+class PooledSession:
+    """Сессия requests с пулом keep-alive соединений.
+
+    Считает запросы и новые соединения, чтобы было видно, насколько часто
+    соединения переиспользуются между циклами и получателями.
+    """
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, keep_alive=True,
+                 pool_block=True):
+        """Пул на pool_size соединений к каждому хосту."""
+        self.session = requests.Session()
+        self.adapter = CountingAdapter(pool_connections=1,
+                                       pool_maxsize=pool_size,
+                                       pool_block=pool_block)
+        self.session.mount('https://', self.adapter)
+        self.session.mount('http://', self.adapter)
+        if not keep_alive:
+            self.session.headers['Connection'] = 'close'
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def get(self, **kwargs):
+        """GET-запрос через общий пул соединений."""
+        with self.lock:
+            self.requests += 1
+        return self.session.get(**kwargs)
+
+    def stats(self):
+        """Статистика переиспользования соединений."""
+        connections = self.adapter.connections
+        return {
+            'requests': self.requests,
+            'connections': connections,
+            'reused': max(self.requests - connections, 0),
+        }
+
+    def close(self):
+        """Закрытие всех соединений пула."""
+        self.session.close()